@@ -0,0 +1,223 @@
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.core.paginator import InvalidPage
+from django.http import HttpResponse
+from django.urls import URLPattern
+from django.utils.cache import patch_vary_headers
+from rest_framework.authentication import get_authorization_header
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from api.pagination import CachedCountPagination, ResolvedCountPaginator
+from api.viewer import ViewerState
+from foodgram.db_router import (
+    acan_read_from_replica, enable_replica_reads, reset_replica_reads
+)
+from ingredients.index import ingredient_index
+from ingredients.models import Ingredient
+from ingredients.serializers import IngredientSerializer
+from ingredients.views import search_params
+from recipes.conditional import (
+    apply_validators, build_validators, is_not_modified, validator_aggregates
+)
+from recipes.models import Recipe
+from recipes.serializers import arender_recipes
+from tags.models import Tag
+from tags.serializers import TagSerializer
+
+# Параметры, которые асинхронная лента рецептов обрабатывает сама;
+# с любыми другими (фильтры, курсор) запрос уходит в синхронное вью.
+RECIPE_LIST_PARAMS = {'page', 'limit'}
+
+
+async def authenticate(request):
+    """
+    Пользователь по ``Authorization: Token <key>``, как в
+    TokenAuthentication. None — заголовок не разобран или токен неверен:
+    ответ с ошибкой формирует синхронное вью.
+    """
+    auth = get_authorization_header(request).split()
+    if not auth or auth[0].lower() != b'token':
+        return AnonymousUser()
+    if len(auth) != 2:
+        return None
+    try:
+        key = auth[1].decode()
+    except UnicodeError:
+        return None
+    token = await Token.objects.select_related('user').filter(
+        key=key).afirst()
+    if token is None or not token.user.is_active:
+        return None
+    return token.user
+
+
+def accepts_json(request):
+    """Браузерный HTML-интерфейс DRF остаётся за синхронными вью."""
+    accept = request.headers.get('Accept', '')
+    if 'text/html' in accept:
+        return False
+    return not accept or '*/*' in accept or 'application/json' in accept
+
+
+def json_response(data):
+    return HttpResponse(JSONRenderer().render(data),
+                        content_type='application/json')
+
+
+async def recipe_list(request, state):
+    if not set(request.GET) <= RECIPE_LIST_PARAMS:
+        return None
+    queryset = Recipe.objects.only('id', 'updated_at', 'created_at')
+    versions = await queryset.order_by().aaggregate(
+        **validator_aggregates(state.user))
+    validators = build_validators(versions, state.user, weak=True)
+    if is_not_modified(request, validators):
+        return apply_validators(HttpResponse(status=304), validators)
+
+    drf_request = Request(request)
+    pagination = CachedCountPagination()
+    pagination.request = drf_request
+    count = await pagination.aresolve_count(drf_request, queryset)
+    paginator = ResolvedCountPaginator(
+        queryset, pagination.get_page_size(drf_request),
+        resolve_count=lambda object_list: count)
+    page_number = request.GET.get(pagination.page_query_param) or 1
+    if page_number in pagination.last_page_strings:
+        page_number = paginator.num_pages
+    try:
+        pagination.page = paginator.page(page_number)
+    except InvalidPage:
+        return None
+    recipes = [recipe async for recipe in pagination.page.object_list]
+    return apply_validators(json_response({
+        'count': count,
+        'count_approximate': pagination.count_approximate,
+        'next': pagination.get_next_link(),
+        'previous': pagination.get_previous_link(),
+        'results': await arender_recipes(recipes, request, state),
+    }), validators)
+
+
+async def recipe_detail(request, state, pk):
+    if request.GET:
+        return None
+    try:
+        queryset = Recipe.objects.filter(pk=pk)
+    except (TypeError, ValueError):
+        return None
+    versions = await queryset.order_by().aaggregate(
+        **validator_aggregates(state.user))
+    validators = build_validators(versions, state.user)
+    if validators is None:
+        return None
+    if is_not_modified(request, validators):
+        return apply_validators(HttpResponse(status=304), validators)
+    recipe = await queryset.only('id', 'updated_at', 'created_at').afirst()
+    if recipe is None:
+        return None
+    rendered = await arender_recipes([recipe], request, state)
+    if not rendered:
+        return None
+    return apply_validators(json_response(rendered[0]), validators)
+
+
+async def tag_list(request, state):
+    return json_response(
+        [TagSerializer(tag).data async for tag in Tag.objects.all()])
+
+
+async def tag_detail(request, state, pk):
+    try:
+        tag = await Tag.objects.filter(pk=pk).afirst()
+    except (TypeError, ValueError):
+        return None
+    if tag is None:
+        return None
+    return json_response(TagSerializer(tag).data)
+
+
+async def ingredient_list(request, state):
+    prefix, limit = search_params(request.GET)
+    return json_response(await ingredient_index.asearch(prefix, limit))
+
+
+async def ingredient_detail(request, state, pk):
+    try:
+        ingredient = await Ingredient.objects.filter(pk=pk).afirst()
+    except (TypeError, ValueError):
+        return None
+    if ingredient is None:
+        return None
+    return json_response(IngredientSerializer(ingredient).data)
+
+
+HANDLERS = {
+    'recipes-list': recipe_list,
+    'recipes-detail': recipe_detail,
+    'tags-list': tag_list,
+    'tags-detail': tag_detail,
+    'ingredients-list': ingredient_list,
+    'ingredients-detail': ingredient_detail,
+}
+
+
+def allowed_methods(sync_view):
+    """Заголовок Allow, который поставил бы DRF-вьюсет."""
+    actions = sync_view.actions
+    return ', '.join(
+        method.upper() for method in sync_view.cls.http_method_names
+        if method in actions or method == 'options'
+        or (method == 'head' and 'get' in actions)
+    )
+
+
+def async_read(sync_view, handler):
+    """
+    Асинхронное вью поверх маршрута DRF: обычные GET-запросы обслуживает
+    handler (с реплики, как ReplicaReadMixin), всё остальное (запись,
+    фильтры, HTML, ошибки авторизации, 404) — исходное вью в потоке
+    через sync_to_async.
+    """
+    fallback = sync_to_async(sync_view)
+    allow = allowed_methods(sync_view)
+
+    async def view(request, *args, **kwargs):
+        if (request.method == 'GET' and 'format' not in kwargs
+                and 'format' not in request.GET and accepts_json(request)):
+            user = await authenticate(request)
+            if user is not None:
+                token = None
+                if await acan_read_from_replica(user):
+                    token = enable_replica_reads()
+                try:
+                    response = await handler(
+                        request, ViewerState(user), *args, **kwargs)
+                finally:
+                    if token is not None:
+                        reset_replica_reads(token)
+                if response is not None:
+                    response['Allow'] = allow
+                    patch_vary_headers(response, ('Accept',))
+                    return response
+        return await fallback(request, *args, **kwargs)
+
+    # cls, actions, csrf_exempt и прочее — для middleware и CSRF.
+    view.__dict__.update(sync_view.__dict__)
+    view.__name__ = sync_view.__name__
+    view.__module__ = sync_view.__module__
+    return view
+
+
+def async_read_urls(patterns):
+    """Подменяет маршруты чтения из HANDLERS асинхронными вью."""
+    result = []
+    for pattern in patterns:
+        handler = HANDLERS.get(getattr(pattern, 'name', None))
+        if handler is not None:
+            pattern = URLPattern(
+                pattern.pattern, async_read(pattern.callback, handler),
+                pattern.default_args, pattern.name)
+        result.append(pattern)
+    return result
@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.checks import Error, register
+
+# Бэкенды, у которых у каждого процесса своя копия кэша.
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register()
+def check_replica_cache(app_configs, **kwargs):
+    """
+    Закрепление за основной базой после записи (foodgram.db_router)
+    хранится в кэше: если он свой у каждого воркера, следующий запрос
+    того же пользователя может попасть в другой воркер и прочитать
+    отстающую реплику.
+    """
+    backend = settings.CACHES['default']['BACKEND']
+    if getattr(settings, 'DATABASE_REPLICAS', []) and (
+            backend in PROCESS_LOCAL_CACHES):
+        return [Error(
+            'Чтение с реплик требует общего для всех процессов кэша.',
+            hint='Задайте CACHE_BACKEND и CACHE_LOCATION, например '
+                 'django.core.cache.backends.redis.RedisCache и '
+                 'redis://redis:6379/0.',
+            obj=backend,
+            id='api.E001',
+        )]
+    return []
@@ -1,5 +1,317 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import hashlib
+import json
+from functools import partial, reduce
+from operator import or_
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework import serializers
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
 
 
 class LimitPageNumberPagination(PageNumberPagination):
     page_size_query_param = 'limit'
+
+
+class ResolvedCountPaginator(Paginator):
+    """Paginator, которому общее число объектов подсказывают снаружи."""
+
+    def __init__(self, *args, resolve_count, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.resolve_count = resolve_count
+
+    @cached_property
+    def count(self):
+        return self.resolve_count(self.object_list)
+
+
+class CachedCountPagination(LimitPageNumberPagination):
+    """
+    Постраничная пагинация с кэшируемым общим количеством.
+
+    COUNT(*) кэшируется на короткое время по нормализованному набору
+    фильтров. Для запросов без фильтров к большой таблице вместо точного
+    подсчёта берётся оценка планировщика PostgreSQL, и в ответе
+    ``count_approximate`` становится ``true``.
+    """
+    count_cache_timeout = getattr(
+        settings, 'PAGINATION_COUNT_CACHE_TIMEOUT', 30)
+    estimate_threshold = getattr(
+        settings, 'PAGINATION_COUNT_ESTIMATE_THRESHOLD', 100_000)
+    ignored_params = ('page', 'limit', 'cursor', 'pagination')
+    # Параметры, результат которых зависит от пользователя.
+    viewer_params = ('is_favorited', 'is_in_shopping_cart')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count_approximate = False
+        self.django_paginator_class = partial(
+            ResolvedCountPaginator,
+            resolve_count=partial(self.resolve_count, request))
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_filter_params(self, request):
+        params = request.query_params
+        return sorted(
+            (key, sorted(params.getlist(key)))
+            for key in params if key not in self.ignored_params
+        )
+
+    def get_count_key(self, request, filters):
+        viewer = None
+        if any(key in self.viewer_params for key, _ in filters):
+            viewer = request.user.pk
+        raw = json.dumps([request.path, viewer, filters])
+        return 'pagination:count:' + hashlib.md5(raw.encode()).hexdigest()
+
+    def resolve_count(self, request, queryset):
+        filters = self.get_filter_params(request)
+        key = self.get_count_key(request, filters)
+        cached = cache.get(key)
+        if cached is not None:
+            count, self.count_approximate = cached
+            return count
+
+        count = None
+        if not filters:
+            count = self.estimate_count(queryset)
+        self.count_approximate = count is not None
+        if count is None:
+            count = queryset.count()
+        cache.set(key, (count, self.count_approximate),
+                  self.count_cache_timeout)
+        return count
+
+    async def aresolve_count(self, request, queryset):
+        """Асинхронный вариант resolve_count для вью под ASGI."""
+        filters = self.get_filter_params(request)
+        key = self.get_count_key(request, filters)
+        cached = await cache.aget(key)
+        if cached is not None:
+            count, self.count_approximate = cached
+            return count
+
+        count = None
+        if not filters:
+            count = await sync_to_async(self.estimate_count)(queryset)
+        self.count_approximate = count is not None
+        if count is None:
+            count = await queryset.acount()
+        await cache.aset(key, (count, self.count_approximate),
+                         self.count_cache_timeout)
+        return count
+
+    def estimate_count(self, queryset):
+        """Оценка числа строк таблицы, если она достаточно велика."""
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class '
+                'WHERE oid = %s::regclass',
+                [queryset.model._meta.db_table])
+            row = cursor.fetchone()
+        if not row or row[0] < self.estimate_threshold:
+            return None
+        return row[0]
+
+    def get_paginated_response(self, data):
+        return Response({
+            'count': self.page.paginator.count,
+            'count_approximate': self.count_approximate,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties']['count_approximate'] = {
+            'type': 'boolean',
+        }
+        return response_schema
+
+
+class KeysetPagination(BasePagination):
+    """
+    Курсорная пагинация по ключу сортировки без OFFSET и COUNT(*).
+
+    Курсор — непрозрачная строка с направлением и значениями полей
+    ``ordering`` у крайнего элемента страницы. Последнее поле должно
+    быть уникальным (id), чтобы порядок был строгим.
+    """
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'limit'
+    max_page_size = 100
+    ordering = ('-created_at', '-id')
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.ordering = getattr(view, 'keyset_ordering', self.ordering)
+        self.model = queryset.model
+        limit = self.get_page_size(request)
+        reverse, position = self.decode_cursor(request)
+
+        ordering = self.ordering
+        if reverse:
+            ordering = tuple(self._invert(field) for field in ordering)
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self._after(ordering, position))
+
+        results = list(queryset[:limit + 1])
+        has_more = len(results) > limit
+        results = results[:limit]
+        if reverse:
+            results.reverse()
+            self.has_next = position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+        self.page = results
+        return results
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True},
+                'previous': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self._link(False, self.page[-1])
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self._link(True, self.page[0])
+
+    def _link(self, reverse, instance):
+        position = [
+            self._value(instance, field.lstrip('-'))
+            for field in self.ordering
+        ]
+        return replace_query_param(
+            self.base_url, self.cursor_query_param,
+            self.encode_cursor(reverse, position))
+
+    @staticmethod
+    def _value(instance, name):
+        if isinstance(instance, dict):
+            value = instance[name]
+        else:
+            value = getattr(instance, name)
+        return value.isoformat() if hasattr(value, 'isoformat') else value
+
+    @staticmethod
+    def _invert(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    def _after(self, ordering, position):
+        """Лексикографическое «строго после позиции» для полей ordering."""
+        conditions = []
+        for index, field in enumerate(ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition = {
+                ordering[i].lstrip('-'): position[i] for i in range(index)
+            }
+            condition[f'{name}__{lookup}'] = position[index]
+            conditions.append(Q(**condition))
+        return reduce(or_, conditions)
+
+    def encode_cursor(self, reverse, position):
+        payload = json.dumps({'r': int(reverse), 'p': position})
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return False, None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            position = payload['p']
+            if len(position) != len(self.ordering):
+                raise ValueError
+            position = [
+                self.model._meta.get_field(field.lstrip('-')).to_python(value)
+                for field, value in zip(self.ordering, position)
+            ]
+            return bool(payload['r']), position
+        except (ValueError, TypeError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def to_html(self):
+        return ''
+
+
+class KeysetOptInMixin:
+    """
+    Включает курсорную пагинацию по ``?pagination=cursor`` или при наличии
+    курсора в запросе; по умолчанию остаётся постраничная.
+
+    Параметры из ``keyset_conflicting_params`` задают свой порядок выдачи,
+    который курсор по ``keyset_ordering`` заменил бы, поэтому вместе с
+    курсорной пагинацией они дают 400.
+    """
+    keyset_pagination_class = KeysetPagination
+    keyset_conflicting_params = ()
+    keyset_conflict_message = (
+        'Параметр нельзя использовать с курсорной пагинацией.')
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            params = self.request.query_params
+            if (params.get('pagination') == 'cursor'
+                    or KeysetPagination.cursor_query_param in params):
+                conflicts = [
+                    name for name in self.keyset_conflicting_params
+                    if params.get(name)
+                ]
+                if conflicts:
+                    raise serializers.ValidationError({
+                        name: [self.keyset_conflict_message]
+                        for name in conflicts
+                    })
+                self._paginator = self.keyset_pagination_class()
+            else:
+                return super().paginator
+        return self._paginator
@@ -0,0 +1,33 @@
+import json
+
+from rest_framework import renderers
+
+
+class ShoppingListRenderer(renderers.BaseRenderer):
+    """
+    Рендерер для согласования формата списка покупок.
+
+    Сам список отдаётся потоком в обход рендерера, а здесь
+    сериализуются только ответы с ошибками.
+    """
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return json.dumps(data, ensure_ascii=False).encode(self.charset)
+
+
+class PlainTextShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+
+class CSVShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class PDFShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'application/pdf'
+    format = 'pdf'
@@ -0,0 +1,36 @@
+from rest_framework.permissions import SAFE_METHODS
+
+from foodgram.db_router import (
+    can_read_from_replica, enable_replica_reads, pin_to_primary,
+    reset_replica_reads
+)
+
+
+class ReplicaReadMixin:
+    """
+    Безопасные запросы к вьюсету читают с реплики (foodgram.db_router).
+
+    Аутентификация выполняется до переключения, по основной базе: только
+    что выданный токен может ещё не дойти до реплики. Успешная запись
+    закрепляет пользователя за основной базой на
+    ``DATABASE_REPLICA_PIN_SECONDS``. Действия из ``primary_read_actions``
+    читают с основной базы всегда — например, если GET что-то создаёт.
+    """
+    primary_read_actions = ()
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if (request.method in SAFE_METHODS
+                and self.action not in self.primary_read_actions
+                and can_read_from_replica(request.user)):
+            self._replica_token = enable_replica_reads()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, '_replica_token', None)
+        if token is not None:
+            del self._replica_token
+            reset_replica_reads(token)
+        elif (request.method not in SAFE_METHODS
+              and response.status_code < 400):
+            pin_to_primary(request.user)
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -0,0 +1,104 @@
+import csv
+import io
+import json
+import os
+import tempfile
+
+from django.conf import settings
+
+EMPTY_MESSAGE = 'Список покупок пуст.'
+PDF_FONT_NAME = 'ShoppingListFont'
+CHUNK_SIZE = 64 * 1024
+
+
+def render_txt(rows):
+    empty = True
+    for name, unit, amount in rows:
+        prefix = '' if empty else '\n'
+        empty = False
+        yield f'{prefix}{name} — {amount} {unit}'.encode()
+    if empty:
+        yield EMPTY_MESSAGE.encode()
+
+
+def render_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(('name', 'measurement_unit', 'amount'))
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+def render_json(rows):
+    separator = '['
+    for name, unit, amount in rows:
+        item = json.dumps(
+            {'name': name, 'measurement_unit': unit, 'amount': amount},
+            ensure_ascii=False)
+        yield f'{separator}{item}'.encode()
+        separator = ','
+    yield b'[]' if separator == '[' else b']'
+
+
+def _pdf_font():
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+
+    path = getattr(settings, 'SHOPPING_LIST_PDF_FONT', '')
+    if not path or not os.path.exists(path):
+        return 'Helvetica'
+    if PDF_FONT_NAME not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(TTFont(PDF_FONT_NAME, path))
+    return PDF_FONT_NAME
+
+
+def render_pdf(rows):
+    """
+    PDF собирается во временный файл (в памяти до 1 МБ, дальше на диске)
+    и отдаётся кусками.
+    """
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    with tempfile.SpooledTemporaryFile(max_size=1024 * 1024) as output:
+        pdf = canvas.Canvas(output, pagesize=A4)
+        font = _pdf_font()
+        width, height = A4
+        margin, line_height = 50, 18
+        y = height - margin
+        pdf.setFont(font, 16)
+        pdf.drawString(margin, y, 'Список покупок')
+        y -= line_height * 2
+        pdf.setFont(font, 12)
+        empty = True
+        for name, unit, amount in rows:
+            empty = False
+            if y < margin:
+                pdf.showPage()
+                pdf.setFont(font, 12)
+                y = height - margin
+            pdf.drawString(margin, y, f'{name} — {amount} {unit}')
+            y -= line_height
+        if empty:
+            pdf.drawString(margin, y, EMPTY_MESSAGE)
+        pdf.save()
+        output.seek(0)
+        while True:
+            chunk = output.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+
+# формат: (Content-Type, функция-генератор)
+FORMATS = {
+    'txt': ('text/plain; charset=utf-8', render_txt),
+    'csv': ('text/csv; charset=utf-8', render_csv),
+    'json': ('application/json', render_json),
+    'pdf': ('application/pdf', render_pdf),
+}
@@ -1,6 +1,8 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
+from api.async_views import async_read_urls
 from recipes.views import RecipeViewSet
 from ingredients.views import IngredientViewSet
 from tags.views import TagViewSet
@@ -12,8 +14,12 @@ router.register('ingredients', IngredientViewSet, basename='ingredients')
 router.register('tags', TagViewSet, basename='tags')
 router.register('users', UserViewSet, basename='users')
 
+router_urls = router.urls
+if settings.ASYNC_READ_VIEWS:
+    router_urls = async_read_urls(router_urls)
+
 urlpatterns = [
-    path('', include(router.urls)),
+    path('', include(router_urls)),
 
     path('auth/', include('djoser.urls')),
     path('auth/', include('djoser.urls.authtoken')),
@@ -2,27 +2,23 @@ from django.db.models import Sum
 from recipes.models import RecipeIngredient
 
 
-def aggregate_ingredients(recipes):
+def iter_aggregated_ingredients(recipes, chunk_size=2000):
     """
-    Принимает queryset рецептов или список объектов Recipe.
-    Возвращает словарь { (ingredient_name, measurement_unit): total_amount }.
-    """
-    # Получаем список id рецептов
-    recipe_ids = (
-        recipes.values_list('id', flat=True)
-        if hasattr(recipes, 'values_list')
-        else [r.id for r in recipes]
-    )
+    Потоково отдаёт кортежи (ingredient_name, measurement_unit, total_amount)
+    в стабильном порядке по названию и единице измерения.
 
-    qs = (
+    На PostgreSQL строки читаются серверным курсором порциями
+    по ``chunk_size``, поэтому память не растёт с размером корзины.
+    """
+    if hasattr(recipes, 'values'):
+        recipes = recipes.values('id')
+    return (
         RecipeIngredient.objects
-        .filter(recipe_id__in=recipe_ids)
+        .filter(recipe_id__in=recipes)
         .values('ingredient__name', 'ingredient__measurement_unit')
         .annotate(total_amount=Sum('amount'))
+        .order_by('ingredient__name', 'ingredient__measurement_unit')
+        .values_list('ingredient__name', 'ingredient__measurement_unit',
+                     'total_amount')
+        .iterator(chunk_size=chunk_size)
     )
-
-    return {
-        (row['ingredient__name'],
-         row['ingredient__measurement_unit']): row['total_amount']
-        for row in qs
-    }
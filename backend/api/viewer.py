@@ -0,0 +1,135 @@
+from django.db import models
+from rest_framework import serializers
+
+from recipes.models import Favorite, ShoppingCart
+from users.models import Subscription
+
+
+class ViewerState:
+    """
+    Отношения текущего пользователя к рецептам и авторам в рамках запроса.
+
+    Списочные сериализаторы заранее подгружают флаги для всей страницы
+    (по одному запросу на каждое отношение), а поля объектов читают их
+    из памяти вместо отдельного EXISTS на каждый объект.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self.is_authenticated = bool(user and user.is_authenticated)
+        self._favorites = {}
+        self._cart = {}
+        self._subscriptions = {}
+
+    @staticmethod
+    def _load(cache, model, lookup, ids, user):
+        missing = {pk for pk in ids if pk not in cache}
+        if not missing:
+            return
+        found = set(
+            model.objects.filter(
+                user=user, **{f'{lookup}__in': missing}
+            ).values_list(lookup, flat=True)
+        )
+        for pk in missing:
+            cache[pk] = pk in found
+
+    @staticmethod
+    async def _aload(cache, model, lookup, ids, user):
+        missing = {pk for pk in ids if pk not in cache}
+        if not missing:
+            return
+        found = {
+            pk async for pk in model.objects.filter(
+                user=user, **{f'{lookup}__in': missing}
+            ).values_list(lookup, flat=True)
+        }
+        for pk in missing:
+            cache[pk] = pk in found
+
+    def prime_recipes(self, recipe_ids):
+        recipe_ids = set(recipe_ids)
+        if not self.is_authenticated:
+            for pk in recipe_ids:
+                self._favorites[pk] = self._cart[pk] = False
+            return
+        self._load(self._favorites, Favorite, 'recipe_id',
+                   recipe_ids, self.user)
+        self._load(self._cart, ShoppingCart, 'recipe_id',
+                   recipe_ids, self.user)
+
+    async def aprime_recipes(self, recipe_ids):
+        """То же, что prime_recipes, для асинхронных вью."""
+        recipe_ids = set(recipe_ids)
+        if not self.is_authenticated:
+            self.prime_recipes(recipe_ids)
+            return
+        await self._aload(self._favorites, Favorite, 'recipe_id',
+                          recipe_ids, self.user)
+        await self._aload(self._cart, ShoppingCart, 'recipe_id',
+                          recipe_ids, self.user)
+
+    def prime_authors(self, author_ids):
+        author_ids = set(author_ids)
+        if not self.is_authenticated:
+            for pk in author_ids:
+                self._subscriptions[pk] = False
+            return
+        self._load(self._subscriptions, Subscription, 'author_id',
+                   author_ids, self.user)
+
+    def remember_subscriptions(self, author_ids):
+        """Отмечает авторов, подписка на которых уже известна из выборки."""
+        for pk in author_ids:
+            self._subscriptions[pk] = self.is_authenticated
+
+    @property
+    def cart_count(self):
+        if not self.is_authenticated:
+            return 0
+        return self.user.shopping_cart_count
+
+    def is_favorited(self, recipe_id):
+        if recipe_id not in self._favorites:
+            self.prime_recipes([recipe_id])
+        return self._favorites[recipe_id]
+
+    def is_in_shopping_cart(self, recipe_id):
+        if recipe_id not in self._cart:
+            self.prime_recipes([recipe_id])
+        return self._cart[recipe_id]
+
+    def is_subscribed(self, author_id):
+        if author_id not in self._subscriptions:
+            self.prime_authors([author_id])
+        return self._subscriptions[author_id]
+
+
+def get_viewer_state(context):
+    """Возвращает (и при необходимости создаёт) состояние для запроса."""
+    request = context.get('request')
+    if request is None:
+        return ViewerState(None)
+    state = getattr(request, '_viewer_state', None)
+    if state is None or state.user is not request.user:
+        state = ViewerState(request.user)
+        request._viewer_state = state
+    return state
+
+
+class ViewerStateListSerializer(serializers.ListSerializer):
+    """
+    Перед сериализацией страницы подгружает флаги для всех её объектов.
+
+    Дочерний сериализатор описывает, что подгружать, в методе
+    ``prime_viewer_state(state, instances)``.
+    """
+
+    def to_representation(self, data):
+        if isinstance(data, models.manager.BaseManager):
+            data = data.all()
+        instances = list(data)
+        prime = getattr(self.child, 'prime_viewer_state', None)
+        if prime is not None and instances:
+            prime(get_viewer_state(self.context), instances)
+        return super().to_representation(instances)
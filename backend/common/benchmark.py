@@ -0,0 +1,247 @@
+import io
+import random
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import transaction
+from PIL import Image
+from rest_framework.test import APIClient
+
+from common.queries import QueryRecorder
+from ingredients.models import Ingredient
+from recipes.coverage import rebuild as rebuild_coverage
+from recipes.models import (
+    Favorite, Recipe, RecipeIngredient, ShoppingCart, TimelineEntry
+)
+from recipes.search import update_search_vector
+from tags.models import Tag
+from users.models import Subscription
+
+User = get_user_model()
+
+# Все синтетические данные помечены префиксом, чтобы их можно было удалить.
+PREFIX = 'bench'
+IMAGE_NAME = f'recipes/images/{PREFIX}.png'
+SCENARIOS = (
+    'recipe_list', 'recipe_list_page', 'recipe_list_filtered',
+    'recipe_list_favorited', 'recipe_list_popular', 'recipe_detail',
+    'subscriptions', 'ingredient_search', 'shopping_list', 'feed',
+)
+WORDS = (
+    'суп', 'салат', 'пирог', 'каша', 'запеканка', 'рагу', 'омлет',
+    'быстрый', 'домашний', 'летний', 'острый', 'сладкий', 'постный',
+)
+
+
+def _pairs(rng, left, right, count, exclude_same=False):
+    """Случайные уникальные пары (a, b), не больше возможного числа."""
+    limit = len(left) * len(right) - (len(left) if exclude_same else 0)
+    count = min(count, max(limit, 0))
+    pairs = set()
+    while len(pairs) < count:
+        pair = rng.choice(left), rng.choice(right)
+        if not (exclude_same and pair[0] == pair[1]):
+            pairs.add(pair)
+    return pairs
+
+
+def flush():
+    """Удаляет ранее засеянные данные."""
+    User.objects.filter(username__startswith=f'{PREFIX}_').delete()
+    Tag.objects.filter(slug__startswith=f'{PREFIX}-').delete()
+
+
+@transaction.atomic
+def seed(users=100, recipes=1000, tags=8, favorites=5000, carts=2000,
+         subscriptions=1000, random_seed=0, batch_size=1000):
+    """
+    Засевает базу синтетическими данными на реальном каталоге
+    ингредиентов (загружается из data/ingredients.csv, если пуст).
+
+    Счётчики, поисковый вектор и индекс ингредиентов перестраиваются
+    так же, как после обычной загрузки.
+    """
+    rng = random.Random(random_seed)
+    if not Ingredient.objects.exists():
+        call_command('load_ingredients', verbosity=0)
+    ingredient_ids = list(Ingredient.objects.values_list('id', flat=True))
+
+    if not default_storage.exists(IMAGE_NAME):
+        buffer = io.BytesIO()
+        Image.new('RGB', (1200, 800), 'orange').save(buffer, 'PNG')
+        default_storage.save(IMAGE_NAME, buffer)
+
+    password = make_password(PREFIX)
+    start = User.objects.filter(username__startswith=f'{PREFIX}_').count()
+    User.objects.bulk_create([
+        User(username=f'{PREFIX}_{i}', email=f'{PREFIX}_{i}@example.com',
+             first_name='Бенч', last_name=str(i), password=password)
+        for i in range(start, start + users)
+    ], batch_size=batch_size)
+    user_ids = list(User.objects.filter(
+        username__startswith=f'{PREFIX}_').values_list('id', flat=True))
+
+    existing_tags = Tag.objects.filter(slug__startswith=f'{PREFIX}-').count()
+    Tag.objects.bulk_create([
+        Tag(name=f'Тег {i}', slug=f'{PREFIX}-{i}')
+        for i in range(existing_tags, max(tags, existing_tags))
+    ])
+    tag_ids = list(Tag.objects.filter(
+        slug__startswith=f'{PREFIX}-').values_list('id', flat=True))
+
+    new_recipes = Recipe.objects.bulk_create([
+        Recipe(
+            author_id=rng.choice(user_ids),
+            name=' '.join(rng.sample(WORDS, 3)).capitalize(),
+            text=' '.join(rng.choices(WORDS, k=30)),
+            cooking_time=rng.randint(5, 180),
+            image=IMAGE_NAME,
+        )
+        for _ in range(recipes)
+    ], batch_size=batch_size)
+    if not new_recipes or new_recipes[0].pk is None:
+        # Без RETURNING (не PostgreSQL/SQLite) id нужно перечитать.
+        new_recipes = list(Recipe.objects.filter(
+            author_id__in=user_ids).order_by('-id')[:recipes])
+    recipe_ids = [recipe.pk for recipe in new_recipes]
+
+    Tags = Recipe.tags.through
+    Tags.objects.bulk_create([
+        Tags(recipe_id=recipe_id, tag_id=tag_id)
+        for recipe_id in recipe_ids
+        for tag_id in rng.sample(tag_ids, rng.randint(1, min(3, len(tag_ids))))
+    ], batch_size=batch_size)
+    RecipeIngredient.objects.bulk_create([
+        RecipeIngredient(recipe_id=recipe_id, ingredient_id=ingredient_id,
+                         amount=rng.randint(1, 500))
+        for recipe_id in recipe_ids
+        for ingredient_id in rng.sample(
+            ingredient_ids, min(rng.randint(3, 12), len(ingredient_ids)))
+    ], batch_size=batch_size)
+
+    for model, count in ((Favorite, favorites), (ShoppingCart, carts)):
+        model.objects.bulk_create([
+            model(user_id=user_id, recipe_id=recipe_id)
+            for user_id, recipe_id in _pairs(rng, user_ids, recipe_ids, count)
+        ], batch_size=batch_size, ignore_conflicts=True)
+    follows = _pairs(
+        rng, user_ids, user_ids, subscriptions, exclude_same=True)
+    Subscription.objects.bulk_create([
+        Subscription(user_id=user_id, author_id=author_id)
+        for user_id, author_id in follows
+    ], batch_size=batch_size, ignore_conflicts=True)
+    # Ленты подписок — как после fan-out засеянных рецептов.
+    by_author = {}
+    for recipe in new_recipes:
+        by_author.setdefault(recipe.author_id, []).append(recipe)
+    TimelineEntry.objects.bulk_create([
+        TimelineEntry(user_id=user_id, recipe_id=recipe.pk,
+                      created_at=recipe.created_at)
+        for user_id, author_id in follows
+        for recipe in by_author.get(author_id, ())
+    ], batch_size=batch_size, ignore_conflicts=True)
+
+    update_search_vector(Recipe.objects.filter(pk__in=recipe_ids))
+    rebuild_coverage(batch_size)
+    call_command('reconcile_counters', verbosity=0, stdout=io.StringIO())
+    return {
+        'users': len(user_ids),
+        'recipes': Recipe.objects.count(),
+        'tags': len(tag_ids),
+        'ingredients': len(ingredient_ids),
+        'favorites': Favorite.objects.count(),
+        'carts': ShoppingCart.objects.count(),
+        'subscriptions': Subscription.objects.count(),
+    }
+
+
+def scenarios(rng):
+    """
+    Имя -> функция, возвращающая (клиент, путь) для очередного запроса.
+    Зритель — засеянный пользователь с самой большой корзиной.
+    """
+    viewer = User.objects.filter(
+        username__startswith=f'{PREFIX}_'
+    ).order_by('-shopping_cart_count', '-id').first()
+    if viewer is None:
+        raise ValueError('Нет засеянных данных: запустите с --seed.')
+    anonymous = APIClient()
+    client = APIClient()
+    client.force_authenticate(viewer)
+    recipe_ids = list(Recipe.objects.values_list('id', flat=True))
+    slugs = list(Tag.objects.values_list('slug', flat=True))
+    names = list(Ingredient.objects.values_list('name', flat=True))
+    pages = max(len(recipe_ids) // 6, 1)
+    return {
+        'recipe_list': lambda: (anonymous, '/api/recipes/'),
+        'recipe_list_page': lambda: (
+            anonymous, f'/api/recipes/?page={rng.randint(1, pages)}'),
+        'recipe_list_filtered': lambda: (
+            client,
+            f'/api/recipes/?tags={rng.choice(slugs)}&is_in_shopping_cart=1'),
+        'recipe_list_favorited': lambda: (
+            client, '/api/recipes/?is_favorited=1'),
+        'recipe_list_popular': lambda: (
+            anonymous, '/api/recipes/?ordering=popular'),
+        'recipe_detail': lambda: (
+            client, f'/api/recipes/{rng.choice(recipe_ids)}/'),
+        'subscriptions': lambda: (
+            client, '/api/users/subscriptions/?recipes_limit=3'),
+        'ingredient_search': lambda: (
+            anonymous, f'/api/ingredients/?name={rng.choice(names)[:3]}'),
+        'shopping_list': lambda: (
+            client, '/api/recipes/download_shopping_cart/'),
+        'feed': lambda: (
+            client, f'/api/recipes/feed/?page={rng.randint(1, 3)}'),
+    }
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    index = min(int(round(fraction * (len(values) - 1))), len(values) - 1)
+    return values[index]
+
+
+def measure(make_request, iterations, warmup):
+    """Время (с чтением потокового тела) и число запросов к БД."""
+    timings = []
+    queries = []
+    statuses = set()
+    for step in range(warmup + iterations):
+        client, path = make_request()
+        recorder = QueryRecorder(path)
+        with recorder.record():
+            started = time.perf_counter()
+            response = client.get(path)
+            if response.streaming:
+                for _ in response.streaming_content:
+                    pass
+            elapsed = time.perf_counter() - started
+        if step < warmup:
+            continue
+        timings.append(elapsed * 1000)
+        queries.append(recorder.count)
+        statuses.add(response.status_code)
+    return {
+        'p50_ms': round(_percentile(timings, 0.5), 2),
+        'p95_ms': round(_percentile(timings, 0.95), 2),
+        'mean_ms': round(statistics.mean(timings), 2),
+        'queries_p50': _percentile(queries, 0.5),
+        'queries_max': max(queries),
+        'statuses': sorted(statuses),
+    }
+
+
+def run(iterations=50, warmup=5, only=None, random_seed=0):
+    """Прогоняет сценарии и возвращает результаты по каждому."""
+    rng = random.Random(random_seed)
+    results = {}
+    for name, make_request in scenarios(rng).items():
+        if only and name not in only:
+            continue
+        results[name] = measure(make_request, iterations, warmup)
+    return results
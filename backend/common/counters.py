@@ -0,0 +1,45 @@
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+
+class CounterFieldsMixin:
+    """
+    Модель со счётчиками из ``counter_fields``: обычный save() уже
+    существующей строки их не перезаписывает, иначе устаревший объект
+    затёр бы изменения, сделанные через change_counters.
+    """
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if (not self._state.adding and not args
+                and kwargs.get('update_fields') is None
+                and not kwargs.get('force_insert')):
+            skipped = {*self.counter_fields, *self.get_deferred_fields()}
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in skipped
+            ]
+        super().save(*args, **kwargs)
+
+
+def change_counters(queryset, **deltas):
+    """
+    Атомарно сдвигает счётчики у строк queryset одним UPDATE:
+    ``change_counters(Recipe.objects.filter(pk=1), favorites_count=1)``.
+    Ниже нуля счётчик не опускается.
+    """
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas:
+        return 0
+    return queryset.update(**{
+        field: Greatest(F(field) + delta, Value(0))
+        for field, delta in deltas.items()
+    })
+
+
+def actual_count(model, field):
+    """Подзапрос с настоящим числом строк model, ссылающихся на OuterRef."""
+    rows = model.objects.filter(**{field: OuterRef('pk')}).order_by()
+    return Coalesce(Subquery(
+        rows.values(field).annotate(value=Count('pk')).values('value')
+    ), Value(0))
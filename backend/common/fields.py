@@ -1,6 +1,7 @@
 import base64
 import uuid
 from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
 from rest_framework import serializers
 
 
@@ -12,3 +13,26 @@ class Base64ImageField(serializers.ImageField):
             file_name = f'{uuid.uuid4()}.{ext}'
             data = ContentFile(base64.b64decode(imgstr), name=file_name)
         return super().to_internal_value(data)
+
+
+class RenditionsField(serializers.ReadOnlyField):
+    """
+    Карта уменьшенных копий изображения для srcset:
+    ``{rendition: {'width': w, 'webp': url, 'jpeg': url}}``.
+    """
+
+    def to_representation(self, value):
+        request = self.context.get('request')
+        result = {}
+        for label, variants in (value or {}).items():
+            result[label] = {}
+            for key, path in variants.items():
+                if key != 'width':
+                    path = absolute_media_url(request, path)
+                result[label][key] = path
+        return result
+
+
+def absolute_media_url(request, name):
+    url = default_storage.url(name)
+    return request.build_absolute_uri(url) if request is not None else url
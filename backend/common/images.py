@@ -0,0 +1,97 @@
+import posixpath
+from io import BytesIO
+
+from django.apps import apps
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from jobs.tasks import enqueue
+
+# имя: ширина в пикселях
+RENDITIONS = {'thumbnail': 160, 'card': 480, 'full': 1200}
+# расширение: (формат Pillow, параметры сохранения)
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 85, 'optimize': True, 'progressive': True}),
+}
+
+
+def build_renditions(name):
+    """
+    Строит уменьшенные копии изображения из хранилища.
+
+    Возвращает ``{rendition: {'width': w, 'webp': path, 'jpeg': path}}``.
+    Изображения не увеличиваются: если оригинал уже, копия остаётся
+    его ширины.
+    """
+    with default_storage.open(name) as source:
+        image = ImageOps.exif_transpose(Image.open(source))
+        image = image.convert('RGB')
+    directory, filename = posixpath.split(name)
+    stem = posixpath.splitext(filename)[0]
+    result = {}
+    for label, width in RENDITIONS.items():
+        copy = image
+        if image.width > width:
+            height = round(image.height * width / image.width)
+            copy = image.resize((width, height), Image.LANCZOS)
+        result[label] = {'width': copy.width}
+        for ext, (fmt, options) in FORMATS.items():
+            buffer = BytesIO()
+            copy.save(buffer, fmt, **options)
+            path = posixpath.join(
+                directory, 'renditions', f'{stem}_{label}.{ext}')
+            result[label][ext] = default_storage.save(
+                path, ContentFile(buffer.getvalue()))
+    return result
+
+
+def process_renditions(model_label, pk, field, target, source):
+    """Строит копии и записывает их в ``target``, если оригинал не сменился."""
+    renditions = build_renditions(source)
+    model = apps.get_model(model_label)
+    values = {target: renditions}
+    if any(f.name == 'updated_at' for f in model._meta.fields):
+        # Меняется представление объекта, а с ним и ключи его кэша.
+        values['updated_at'] = timezone.now()
+    updated = model.objects.filter(
+        pk=pk, **{field: source}).update(**values)
+    if not updated:
+        delete_files(rendition_paths(renditions))
+
+
+def rendition_paths(renditions):
+    """Пути всех файлов из словаря копий."""
+    return [
+        variants[ext]
+        for variants in renditions.values()
+        for ext in FORMATS if ext in variants
+    ]
+
+
+def delete_files(paths):
+    for path in paths:
+        default_storage.delete(path)
+
+
+def schedule_renditions_cleanup(renditions):
+    """
+    Ставит удаление файлов прежних копий в очередь: задача видна
+    воркерам только после коммита, поэтому откат их не теряет.
+    """
+    paths = rendition_paths(renditions)
+    if paths:
+        enqueue('common.delete_files', paths=paths)
+
+
+def schedule_renditions(instance, field, target):
+    """
+    Ставит построение копий изображения в очередь фоновых задач;
+    запрос не ждёт работы Pillow.
+    """
+    source = getattr(instance, field).name
+    if source:
+        enqueue('common.build_renditions', model_label=instance._meta.label,
+                pk=instance.pk, field=field, target=target, source=source)
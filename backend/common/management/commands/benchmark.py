@@ -0,0 +1,77 @@
+import json
+import sys
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from common import benchmark
+
+
+class Command(BaseCommand):
+    help = ('Замер задержек (p50/p95) и числа SQL-запросов основных '
+            'эндпоинтов API, при необходимости с засевом данных')
+
+    def add_arguments(self, parser):
+        seeding = parser.add_argument_group('засев данных')
+        seeding.add_argument('--seed', action='store_true',
+                             help='Засеять синтетические данные перед '
+                                  'замером')
+        seeding.add_argument('--flush', action='store_true',
+                             help='Удалить ранее засеянные данные')
+        seeding.add_argument('--users', type=int, default=100)
+        seeding.add_argument('--recipes', type=int, default=1000)
+        seeding.add_argument('--tags', type=int, default=8)
+        seeding.add_argument('--favorites', type=int, default=5000)
+        seeding.add_argument('--carts', type=int, default=2000)
+        seeding.add_argument('--subscriptions', type=int, default=1000)
+        parser.add_argument('--iterations', type=int, default=50,
+                            help='Замеров на сценарий (по умолчанию 50)')
+        parser.add_argument('--warmup', type=int, default=5,
+                            help='Прогревочных запросов (по умолчанию 5)')
+        parser.add_argument('--scenario', action='append',
+                            choices=benchmark.SCENARIOS,
+                            help='Только указанные сценарии')
+        parser.add_argument('--random-seed', type=int, default=0)
+        parser.add_argument('--output', '-o',
+                            help='Файл для JSON с результатами '
+                                 '(по умолчанию stdout)')
+
+    def handle(self, *args, **options):
+        if options['flush']:
+            benchmark.flush()
+        volumes = None
+        if options['seed']:
+            volumes = benchmark.seed(
+                users=options['users'],
+                recipes=options['recipes'],
+                tags=max(options['tags'], 1),
+                favorites=options['favorites'],
+                carts=options['carts'],
+                subscriptions=options['subscriptions'],
+                random_seed=options['random_seed'],
+            )
+            self.stderr.write(f'Засеяно: {volumes}')
+        try:
+            results = benchmark.run(
+                iterations=max(options['iterations'], 1),
+                warmup=max(options['warmup'], 0),
+                only=options['scenario'],
+                random_seed=options['random_seed'],
+            )
+        except ValueError as e:
+            self.stderr.write(self.style.ERROR(str(e)))
+            return
+        report = {
+            'created_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'iterations': options['iterations'],
+            'volumes': volumes,
+            'scenarios': results,
+        }
+        output = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(output + '\n')
+        else:
+            sys.stdout.write(output + '\n')
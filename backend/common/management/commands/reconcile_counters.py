@@ -0,0 +1,77 @@
+from functools import reduce
+from operator import or_
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db.models import F, Max, Q
+
+from common.counters import actual_count
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import Subscription
+
+User = get_user_model()
+
+# Модель -> {счётчик: (модель строк, поле со ссылкой на владельца)}.
+COUNTERS = {
+    Recipe: {
+        'favorites_count': (Favorite, 'recipe'),
+        'carts_count': (ShoppingCart, 'recipe'),
+    },
+    User: {
+        'recipes_count': (Recipe, 'author'),
+        'subscribers_count': (Subscription, 'author'),
+        'shopping_cart_count': (ShoppingCart, 'user'),
+    },
+}
+
+
+class Command(BaseCommand):
+    help = 'Сверка денормализованных счётчиков с настоящими данными'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Сколько строк сверять за раз (по умолчанию 1000)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только посчитать расхождения, ничего не исправлять'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(options['batch_size'], 1)
+        for model, counters in COUNTERS.items():
+            fixed = self.reconcile(
+                model, counters, batch_size, options['dry_run'])
+            self.stdout.write(self.style.SUCCESS(
+                f'{model._meta.verbose_name_plural}: '
+                f'расхождений {fixed}'))
+
+    @staticmethod
+    def reconcile(model, counters, batch_size, dry_run):
+        actual = {
+            f'actual_{field}': actual_count(*source)
+            for field, source in counters.items()
+        }
+        drifted = reduce(or_, (
+            ~Q(**{field: F(f'actual_{field}')}) for field in counters
+        ))
+        last = model.objects.aggregate(last=Max('pk'))['last'] or 0
+        fixed = 0
+        for start in range(0, last + 1, batch_size):
+            ids = list(
+                model.objects.filter(
+                    pk__gte=start, pk__lt=start + batch_size
+                ).annotate(**actual).filter(drifted).values_list(
+                    'pk', flat=True)
+            )
+            if ids and not dry_run:
+                model.objects.filter(pk__in=ids).update(**{
+                    field: actual_count(*source)
+                    for field, source in counters.items()
+                })
+            fixed += len(ids)
+        return fixed
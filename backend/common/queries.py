@@ -0,0 +1,170 @@
+import json
+import logging
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger('foodgram.queries')
+slow_logger = logging.getLogger('foodgram.queries.slow')
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Запрос выполнил больше SQL-запросов, чем разрешено бюджетом."""
+
+
+class QueryRecorder:
+    """
+    Обёртка для ``connection.execute_wrapper``: считает запросы, их общее
+    время и повторы одинакового SQL, медленные пишет в отдельный лог.
+    """
+
+    def __init__(self, view=None, slow_threshold=None):
+        self.view = view
+        if slow_threshold is None:
+            slow_threshold = getattr(settings, 'SLOW_QUERY_THRESHOLD_MS', 200)
+        self.slow_threshold = slow_threshold / 1000
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.monotonic()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.monotonic() - started
+            self.count += 1
+            self.duration += elapsed
+            self.statements[sql] += 1
+            if elapsed >= self.slow_threshold:
+                slow_logger.warning(json.dumps({
+                    'view': self.view,
+                    'database': context['connection'].alias,
+                    'duration_ms': round(elapsed * 1000, 2),
+                    'sql': sql,
+                }, ensure_ascii=False))
+
+    @property
+    def duplicates(self):
+        """SQL, выполненный больше одного раза, с числом повторов."""
+        return {sql: n for sql, n in self.statements.items() if n > 1}
+
+    def summary(self):
+        return {
+            'view': self.view,
+            'queries': self.count,
+            'duration_ms': round(self.duration * 1000, 2),
+            'duplicates': len(self.duplicates),
+        }
+
+    @contextmanager
+    def record(self):
+        """Подключает счётчик ко всем соединениям на время блока."""
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(
+                    connections[alias].execute_wrapper(self))
+            yield self
+
+
+def check_budget(recorder, budget, raise_exception):
+    if budget is None or recorder.count <= budget:
+        return
+    message = (
+        f'{recorder.view or "Блок"}: {recorder.count} SQL-запросов '
+        f'при бюджете {budget}, повторов {len(recorder.duplicates)}'
+    )
+    if raise_exception:
+        raise QueryBudgetExceeded(message)
+    logger.warning(message, extra={'query_stats': recorder.summary()})
+
+
+@contextmanager
+def query_budget(budget, view=None):
+    """
+    Для тестов: падает с QueryBudgetExceeded, если блок выполнил больше
+    ``budget`` запросов::
+
+        with query_budget(5) as queries:
+            client.get('/api/recipes/')
+        assert not queries.duplicates
+    """
+    recorder = QueryRecorder(view)
+    with recorder.record():
+        yield recorder
+    check_budget(recorder, budget, raise_exception=True)
+
+
+class QueryBudgetMiddleware:
+    """
+    Считает SQL-запросы каждого запроса к API и сверяет их с бюджетом вью.
+
+    При превышении пишет предупреждение в лог ``foodgram.queries``, а с
+    ``QUERY_BUDGET_RAISE = True`` (тесты) — бросает QueryBudgetExceeded.
+    Итоги запроса добавляются в заголовки ``X-Query-Count`` и
+    ``X-Query-Duration`` при DEBUG.
+
+    Тело потокового ответа (список покупок) формируется уже после выхода
+    из вью: счётчик остаётся подключённым, пока оно отдаётся, а бюджет
+    сверяется после последнего фрагмента. Заголовков у таких ответов
+    нет — к моменту их отправки запросы ещё не выполнены.
+
+    Под ASGI запросы асинхронной цепочки не считаются: асинхронный ORM
+    выполняет их в отдельном потоке, мимо обёрток соединения.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.default_budget = getattr(settings, 'QUERY_BUDGET_DEFAULT', None)
+        self.raise_exception = getattr(settings, 'QUERY_BUDGET_RAISE', False)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.get_response(request)
+        recorder = QueryRecorder()
+        request._query_recorder = recorder
+        with recorder.record():
+            response = self.get_response(request)
+        budget = getattr(request, '_query_budget', self.default_budget)
+        if response.streaming:
+            response.streaming_content = self.record_stream(
+                response.streaming_content, recorder, budget)
+            return response
+        if settings.DEBUG:
+            response['X-Query-Count'] = str(recorder.count)
+            response['X-Query-Duration'] = f'{recorder.duration * 1000:.1f}'
+        check_budget(recorder, budget, self.raise_exception)
+        return response
+
+    def record_stream(self, content, recorder, budget):
+        with recorder.record():
+            yield from content
+        check_budget(recorder, budget, self.raise_exception)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        recorder = getattr(request, '_query_recorder', None)
+        if recorder is None:
+            return None
+        # Бюджет задаётся атрибутом query_budget у вью или словарём
+        # query_budgets = {action: n} у DRF-вьюсета.
+        cls = getattr(view_func, 'cls', None)
+        owner = cls or view_func
+        name = f'{owner.__module__}.{owner.__qualname__}'
+        budget = getattr(owner, 'query_budget', None)
+        actions = getattr(view_func, 'actions', None) or {}
+        action = actions.get(request.method.lower())
+        if action is not None:
+            name = f'{name}.{action}'
+            budget = getattr(cls, 'query_budgets', {}).get(action, budget)
+        recorder.view = name
+        if budget is not None:
+            request._query_budget = budget
+        return None
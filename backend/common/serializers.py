@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from common.fields import RenditionsField
 from recipes.models import Recipe
 
 User = get_user_model()
@@ -14,6 +15,8 @@ class UserBaseSerializer(serializers.ModelSerializer):
 
 class RecipeBaseSerializer(serializers.ModelSerializer):
     """Базовый рецепт: для избранного, корзины, вложенных списков."""
+    image_renditions = RenditionsField()
+
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_renditions', 'cooking_time')
@@ -0,0 +1,12 @@
+from jobs.tasks import task
+from .images import delete_files, process_renditions
+
+
+@task('common.build_renditions')
+def build_renditions(model_label, pk, field, target, source):
+    process_renditions(model_label, pk, field, target, source)
+
+
+@task('common.delete_files')
+def delete_stored_files(paths):
+    delete_files(paths)
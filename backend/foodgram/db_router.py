@@ -0,0 +1,76 @@
+"""
+Маршрутизация запросов к репликам PostgreSQL.
+
+По умолчанию всё читается и пишется в основную базу ``default``. Чтение
+с реплик (``DATABASE_REPLICAS``) включается явно на время запроса, см.
+``api.replicas.ReplicaReadMixin``. Пользователь, только что изменивший
+данные, какое-то время читает с основной базы, чтобы увидеть свои
+изменения несмотря на отставание реплик.
+"""
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+_replica = ContextVar('replica', default=None)
+
+
+def replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def _pin_key(user):
+    return f'db:primary:{user.pk}'
+
+
+def pin_to_primary(user):
+    """Следующие несколько секунд чтение для user идёт с основной базы."""
+    if replicas() and user.is_authenticated:
+        cache.set(_pin_key(user), True,
+                  getattr(settings, 'DATABASE_REPLICA_PIN_SECONDS', 10))
+
+
+def can_read_from_replica(user):
+    if not replicas():
+        return False
+    return not (user.is_authenticated and cache.get(_pin_key(user), False))
+
+
+async def acan_read_from_replica(user):
+    if not replicas():
+        return False
+    return not (user.is_authenticated
+                and await cache.aget(_pin_key(user), False))
+
+
+def enable_replica_reads():
+    """
+    Направляет чтение на одну случайную реплику — весь запрос видит один
+    и тот же снимок данных. Вернуть как было — reset_replica_reads.
+    """
+    return _replica.set(random.choice(replicas()))
+
+
+def reset_replica_reads(token):
+    _replica.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Запись и блокирующие чтения (select_for_update, get_or_create) —
+    только основная база; обычное чтение — реплика, если чтение с неё
+    включено для текущего запроса. Миграции не ограничены: схему
+    локальной реплики можно создать ``migrate --database``.
+    """
+
+    def db_for_read(self, model, **hints):
+        return _replica.get() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же данные, что и основная база.
+        return True
@@ -39,10 +39,12 @@ INSTALLED_APPS = [
     'api',
     'common',
     'shortener',
+    'jobs',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'common.queries.QueryBudgetMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -70,6 +72,12 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'foodgram.wsgi.application'
+ASGI_APPLICATION = 'foodgram.asgi.application'
+
+# Асинхронные вью чтения (рецепты, теги, ингредиенты, короткие ссылки).
+# Включать при запуске под ASGI (см. gunicorn.conf.py); под WSGI они
+# работали бы через async_to_sync и только добавили бы накладных расходов.
+ASYNC_READ_VIEWS = os.getenv('ASYNC_READ_VIEWS', 'False') == 'True'
 
 CSRF_TRUSTED_ORIGINS = [
     "https://foodgram.practicum-work.ru",
@@ -92,7 +100,47 @@ DATABASES = {
         'USER': os.getenv('POSTGRES_USER', 'foodgram_user'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
         'HOST': os.getenv('DB_HOST', ''),
-        'PORT': os.getenv('DB_PORT', 5432)
+        'PORT': os.getenv('DB_PORT', 5432),
+        # Сколько секунд держать соединение открытым между запросами
+        # (0 — закрывать после каждого); перед повторным использованием
+        # соединение можно проверять.
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 0)),
+        'CONN_HEALTH_CHECKS': os.getenv(
+            'DB_CONN_HEALTH_CHECKS', 'False') == 'True',
+    }
+}
+
+# Реплики для чтения: DB_REPLICA_HOSTS — хосты через запятую, остальные
+# параметры как у основной базы (DB_REPLICA_NAME/DB_REPLICA_PORT — если
+# отличаются). В тестах реплики — зеркала основной базы.
+DATABASE_REPLICAS = []
+for number, host in enumerate(
+        filter(None, os.getenv('DB_REPLICA_HOSTS', '').split(',')), 1):
+    alias = f'replica{number}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'NAME': os.getenv('DB_REPLICA_NAME', DATABASES['default']['NAME']),
+        'HOST': host.strip(),
+        'PORT': os.getenv('DB_REPLICA_PORT', DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+DATABASE_ROUTERS = ['foodgram.db_router.ReplicaRouter']
+# Сколько секунд после записи пользователь читает с основной базы.
+DATABASE_REPLICA_PIN_SECONDS = int(
+    os.getenv('DATABASE_REPLICA_PIN_SECONDS', 10))
+
+# Общий кэш: по умолчанию в памяти процесса, в продакшене — Redis через
+# CACHE_BACKEND=django.core.cache.backends.redis.RedisCache и
+# CACHE_LOCATION=redis://redis:6379/0. С репликами кэш в памяти процесса
+# не проходит проверку api.E001.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
     }
 }
 
@@ -156,6 +204,74 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.AllowAny',
     ],
 }
+# Общее число объектов в постраничных ответах кэшируется на несколько
+# секунд; для таблиц больше порога без фильтров берётся оценка планировщика.
+PAGINATION_COUNT_CACHE_TIMEOUT = int(
+    os.getenv('PAGINATION_COUNT_CACHE_TIMEOUT', 30))
+PAGINATION_COUNT_ESTIMATE_THRESHOLD = int(
+    os.getenv('PAGINATION_COUNT_ESTIMATE_THRESHOLD', 100_000))
+
+# Фоновые задачи (manage.py run_workers): задержка перед повтором растёт
+# экспоненциально от базовой; зависшие дольше таймаута задачи
+# возвращаются в очередь.
+JOBS_RETRY_BASE_DELAY = int(os.getenv('JOBS_RETRY_BASE_DELAY', 10))
+JOBS_RETRY_MAX_DELAY = int(os.getenv('JOBS_RETRY_MAX_DELAY', 60 * 60))
+JOBS_LOCK_TIMEOUT = int(os.getenv('JOBS_LOCK_TIMEOUT', 15 * 60))
+
+# Лента подписок (recipes.feed): рецепты авторов с большим числом
+# подписчиков не раскладываются по лентам, а подмешиваются при чтении;
+# при подписке в ленту добавляются последние FEED_BACKFILL_LIMIT рецептов.
+FEED_FANOUT_MAX_SUBSCRIBERS = int(
+    os.getenv('FEED_FANOUT_MAX_SUBSCRIBERS', 10_000))
+FEED_BACKFILL_LIMIT = int(os.getenv('FEED_BACKFILL_LIMIT', 100))
+
+# Рейтинги ?ordering=trending|popular (recipes.rankings): размер, время
+# жизни в кэше, окно и период полураспада для trending, в часах.
+RANKING_SIZE = int(os.getenv('RANKING_SIZE', 100))
+RANKING_CACHE_TIMEOUT = int(os.getenv('RANKING_CACHE_TIMEOUT', 5 * 60))
+TRENDING_WINDOW_HOURS = int(os.getenv('TRENDING_WINDOW_HOURS', 7 * 24))
+TRENDING_HALF_LIFE_HOURS = int(os.getenv('TRENDING_HALF_LIFE_HOURS', 24))
+
+# Как часто процесс сверяет индекс ингредиентов с таблицей и сколько
+# живёт в кэше словарь тегов, секунд.
+INGREDIENT_INDEX_CHECK_SECONDS = int(
+    os.getenv('INGREDIENT_INDEX_CHECK_SECONDS', 30))
+TAG_REGISTRY_CACHE_TIMEOUT = int(os.getenv('TAG_REGISTRY_CACHE_TIMEOUT', 60))
+
+# TTF-шрифт с кириллицей для PDF-версии списка покупок.
+SHOPPING_LIST_PDF_FONT = os.getenv(
+    'SHOPPING_LIST_PDF_FONT',
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+)
+
+# Бюджеты SQL-запросов на запрос (см. common.queries): при превышении —
+# предупреждение в лог, с QUERY_BUDGET_RAISE=True (тесты) — исключение.
+# Запросы дольше порога пишутся в лог foodgram.queries.slow.
+QUERY_BUDGET_DEFAULT = (
+    int(os.getenv('QUERY_BUDGET_DEFAULT'))
+    if os.getenv('QUERY_BUDGET_DEFAULT') else None
+)
+QUERY_BUDGET_RAISE = os.getenv('QUERY_BUDGET_RAISE', 'False') == 'True'
+SLOW_QUERY_THRESHOLD_MS = int(os.getenv('SLOW_QUERY_THRESHOLD_MS', 200))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'plain': {'format': '%(asctime)s %(levelname)s %(name)s %(message)s'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': 'plain'},
+    },
+    'loggers': {
+        'foodgram.queries': {
+            'handlers': ['console'],
+            'level': os.getenv('QUERY_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+    },
+}
+
 DJOSER = {
     'LOGIN_FIELD': 'email',
     'USER_CREATE_PASSWORD_RETYPE': True,
@@ -4,12 +4,15 @@ from django.conf.urls.static import static
 from django.views.generic import TemplateView
 from django.views.static import serve
 from django.conf import settings
-from shortener.views import redirect_short_link
+from shortener.views import aredirect_short_link, redirect_short_link
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('api.urls')),
-    path('s/<str:code>/', redirect_short_link, name='short-link'),
+    path('s/<str:code>/',
+         aredirect_short_link if settings.ASYNC_READ_VIEWS
+         else redirect_short_link,
+         name='short-link'),
 
     path('api/docs/',
          TemplateView.as_view(template_name='redoc.html'), name='redoc'),
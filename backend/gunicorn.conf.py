@@ -0,0 +1,22 @@
+"""
+Настройки gunicorn.
+
+По умолчанию — синхронные WSGI-воркеры, как раньше. С
+ASYNC_READ_VIEWS=True приложение запускается под ASGI воркерами uvicorn:
+каждый воркер обслуживает много соединений сразу, поэтому их число
+считается от ядер, а не от ожидаемой конкуренции.
+"""
+import multiprocessing
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8080')
+
+if os.getenv('ASYNC_READ_VIEWS', 'False') == 'True':
+    wsgi_app = 'foodgram.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+    workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count()))
+else:
+    wsgi_app = 'foodgram.wsgi:application'
+    workers = int(os.getenv('GUNICORN_WORKERS', 1))
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
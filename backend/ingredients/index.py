@@ -0,0 +1,103 @@
+import bisect
+import threading
+import time
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+
+from .models import Ingredient
+
+VERSION_KEY = 'ingredients:index:version'
+
+
+def normalize(value):
+    """Ключ поиска: без учёта регистра, «ё» приравнена к «е»."""
+    return value.casefold().replace('ё', 'е')
+
+
+class IngredientPrefixIndex:
+    """
+    Отсортированный по нормализованному названию массив ингредиентов
+    в памяти процесса; префиксный поиск — два бинарных поиска.
+
+    Версия индекса — число строк и наибольший id в таблице, их процесс
+    сверяет с базой не чаще раза в ``INGREDIENT_INDEX_CHECK_SECONDS``:
+    так загрузка через load_ingredients в другом процессе видна всем
+    воркерам без общего кэша. Правки существующих строк версию не
+    меняют, поэтому к ней добавлена метка из кэша, которую сбрасывает
+    invalidate(): другие процессы увидят её, только если кэш общий.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._checked_at = 0.0
+        self._index = ([], [])
+
+    @staticmethod
+    def current_version():
+        stats = Ingredient.objects.aggregate(
+            count=Count('id'), last_id=Max('id'))
+        return cache.get(VERSION_KEY), stats['count'], stats['last_id']
+
+    def _is_fresh(self, token):
+        interval = getattr(settings, 'INGREDIENT_INDEX_CHECK_SECONDS', 30)
+        return (self._version is not None
+                and token == self._version[0]
+                and time.monotonic() - self._checked_at < interval)
+
+    def _ensure_fresh(self):
+        if self._is_fresh(cache.get(VERSION_KEY)):
+            return
+        with self._lock:
+            version = self.current_version()
+            if version != self._version:
+                self._build(version)
+            self._checked_at = time.monotonic()
+
+    def _build(self, version):
+        entries = sorted(
+            (normalize(name), name, pk, unit)
+            for pk, name, unit in Ingredient.objects.values_list(
+                'id', 'name', 'measurement_unit')
+        )
+        # Одно присваивание: параллельный _lookup не увидит ключи от
+        # новой версии вместе со строками от старой.
+        self._index = (
+            [entry[0] for entry in entries],
+            [{'id': pk, 'name': name, 'measurement_unit': unit}
+             for _, name, pk, unit in entries],
+        )
+        self._version = version
+
+    async def _aensure_fresh(self):
+        if not self._is_fresh(await cache.aget(VERSION_KEY)):
+            await sync_to_async(self._ensure_fresh)()
+
+    def search(self, prefix='', limit=None):
+        self._ensure_fresh()
+        return self._lookup(prefix, limit)
+
+    async def asearch(self, prefix='', limit=None):
+        """Поиск из асинхронного вью: перестройка — в отдельном потоке."""
+        await self._aensure_fresh()
+        return self._lookup(prefix, limit)
+
+    def _lookup(self, prefix, limit):
+        keys, items = self._index
+        key = normalize(prefix)
+        start = bisect.bisect_left(keys, key)
+        end = bisect.bisect_left(keys, key + '\U0010ffff', lo=start)
+        if limit is not None:
+            end = min(end, start + limit)
+        return items[start:end]
+
+
+def invalidate():
+    cache.set(VERSION_KEY, uuid.uuid4().hex, None)
+
+
+ingredient_index = IngredientPrefixIndex()
@@ -1,64 +1,179 @@
 import csv
 import json
 import logging
+import sys
+from contextlib import nullcontext
+from itertools import islice
 from pathlib import Path
 
 from django.conf import settings
 from django.core.management.base import BaseCommand
 from django.db import transaction
 
+from ingredients.index import invalidate
 from ingredients.models import Ingredient
 
 logger = logging.getLogger(__name__)
 
+READ_SIZE = 64 * 1024
+
+
+def iter_csv(stream):
+    for row in csv.reader(stream):
+        if len(row) < 2:
+            logger.warning(f'Пропущена строка: {row}')
+            continue
+        yield row[0], row[1]
+
+
+def iter_json(stream):
+    """Потоково разбирает JSON-массив объектов, не читая файл целиком."""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    started = False
+    while True:
+        chunk = stream.read(READ_SIZE)
+        buffer = buffer[position:] + chunk
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if not started and position < len(buffer):
+                if buffer[position] != '[':
+                    raise ValueError('Ожидался JSON-массив.')
+                started = True
+                position += 1
+                continue
+            if position < len(buffer) and buffer[position] == ']':
+                return
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except ValueError:
+                if not chunk:
+                    raise
+                break
+            yield item['name'], item['measurement_unit']
+        if not chunk:
+            return
+
+
+PARSERS = {'csv': iter_csv, 'json': iter_json}
+
 
 class Command(BaseCommand):
-    help = 'Загрузка ингредиентов из data/ingredients.csv или ingredients.json'
+    help = ('Загрузка ингредиентов из CSV или JSON (файл, stdin или '
+            'data/ingredients.<format>) пакетами')
 
     def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            nargs='?',
+            help='Путь к файлу или "-" для stdin '
+                 '(по умолчанию data/ingredients.<format>)'
+        )
         parser.add_argument(
             '--format',
-            choices=['csv', 'json'],
-            default='csv',
-            help='Формат файла: csv или json (по умолчанию csv)'
+            choices=sorted(PARSERS),
+            help='Формат файла: csv или json (по умолчанию по расширению, '
+                 'иначе csv)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Сколько строк вставлять за один запрос (по умолчанию 1000)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Ничего не записывать, только посчитать новые ингредиенты'
+        )
+        parser.add_argument(
+            '--diff',
+            action='store_true',
+            help='Вывести каждый ингредиент, которого ещё нет в базе'
         )
 
     def handle(self, *args, **options):
-        data_dir = Path(settings.BASE_DIR) / 'data'
+        path = options['path']
         fmt = options['format']
+        if fmt is None:
+            suffix = Path(path).suffix.lstrip('.') if path else ''
+            fmt = suffix if suffix in PARSERS else 'csv'
+        if path is None:
+            path = Path(settings.BASE_DIR) / 'data' / f'ingredients.{fmt}'
+        batch_size = max(options['batch_size'], 1)
+        self.verbosity = options['verbosity']
 
-        file_path = data_dir / f'ingredients.{fmt}'
-        if not file_path.exists():
-            self.stderr.write(self.style.ERROR(f'Файл {file_path} не найден'))
-            return
+        if path == '-':
+            stream = nullcontext(sys.stdin)
+        else:
+            path = Path(path)
+            if not path.exists():
+                self.stderr.write(self.style.ERROR(f'Файл {path} не найден'))
+                return
+            stream = open(path, encoding='utf-8')
 
         try:
-            with transaction.atomic():
-                if fmt == 'csv':
-                    with open(file_path, encoding='utf-8') as f:
-                        reader = csv.reader(f)
-                        for row in reader:
-                            if len(row) < 2:
-                                logger.warning(f'Пропущена строка: {row}')
-                                continue
-                            name, unit = row
-                            Ingredient.objects.get_or_create(
-                                name=name.strip(),
-                                measurement_unit=unit.strip()
-                            )
-                else:  # json
-                    with open(file_path, encoding='utf-8') as f:
-                        data = json.load(f)
-                        for item in data:
-                            Ingredient.objects.get_or_create(
-                                name=item['name'].strip(),
-                                measurement_unit=item[
-                                    'measurement_unit'
-                                ].strip()
-                            )
+            with stream as source, transaction.atomic():
+                processed, added = self.load(
+                    PARSERS[fmt](source), batch_size,
+                    options['dry_run'], options['diff'])
+                if options['dry_run']:
+                    transaction.set_rollback(True)
+                elif added:
+                    transaction.on_commit(invalidate)
         except Exception as e:
             logger.exception("Ошибка при загрузке ингредиентов")
             self.stderr.write(self.style.ERROR(f'Ошибка: {e}'))
             return
 
-        self.stdout.write(self.style.SUCCESS('Ингредиенты успешно загружены'))
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(
+                f'Проверено строк: {processed}, будет добавлено: {added}'))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f'Ингредиенты успешно загружены: строк {processed}, '
+            f'добавлено {added}'))
+
+    def load(self, rows, batch_size, dry_run, diff):
+        rows = (
+            (name.strip(), unit.strip()) for name, unit in rows
+        )
+        processed = added = 0
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            processed += len(batch)
+            new = self.new_pairs(batch)
+            added += len(new)
+            if diff:
+                for name, unit in new:
+                    self.stdout.write(f'+ {name} ({unit})')
+            if new and not dry_run:
+                Ingredient.objects.bulk_create(
+                    [Ingredient(name=name, measurement_unit=unit)
+                     for name, unit in new],
+                    ignore_conflicts=True,
+                )
+            if self.verbosity:
+                self.stdout.write(
+                    f'Обработано строк: {processed}, новых: {added}')
+        return processed, added
+
+    @staticmethod
+    def new_pairs(batch):
+        """Пары (название, единица) из пакета, которых ещё нет в базе."""
+        existing = set(
+            Ingredient.objects.filter(
+                name__in={name for name, _ in batch}
+            ).values_list('name', 'measurement_unit')
+        )
+        new = []
+        for pair in batch:
+            if pair not in existing:
+                existing.add(pair)
+                new.append(pair)
+        return new
@@ -1,14 +1,35 @@
 from rest_framework import viewsets, mixins
-from rest_framework.filters import SearchFilter
+from rest_framework.response import Response
+
+from api.replicas import ReplicaReadMixin
+from .index import ingredient_index
 from .models import Ingredient
 from .serializers import IngredientSerializer
 
 
-class IngredientViewSet(mixins.ListModelMixin,
+def search_params(params):
+    """Префикс (name или search) и limit из параметров запроса."""
+    prefix = params.get('name', params.get('search', ''))
+    try:
+        limit = int(params['limit'])
+    except (KeyError, ValueError):
+        limit = None
+    if limit is not None and limit <= 0:
+        limit = None
+    return prefix, limit
+
+
+class IngredientViewSet(ReplicaReadMixin,
+                        mixins.ListModelMixin,
                         mixins.RetrieveModelMixin,
                         viewsets.GenericViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
-    filter_backends = [SearchFilter]
-    search_fields = ['^name']
+    filter_backends = []
     pagination_class = None
+    query_budget = 2
+
+    def list(self, request, *args, **kwargs):
+        """Автодополнение по началу названия из индекса в памяти."""
+        prefix, limit = search_params(request.query_params)
+        return Response(ingredient_index.search(prefix, limit))
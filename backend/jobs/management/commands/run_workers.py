@@ -0,0 +1,113 @@
+import os
+import signal
+import time
+from concurrent.futures import (
+    FIRST_COMPLETED, ProcessPoolExecutor, wait
+)
+from concurrent.futures.process import BrokenProcessPool
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from jobs.worker import claim_jobs, release_lost_jobs, run_job
+
+
+def _init_process():
+    # Останавливает воркеры родитель, а при fork дочерний процесс
+    # наследует соединения родителя: их нельзя использовать совместно.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    django.setup()
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Запуск воркеров фоновых задач'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Число процессов-воркеров (по умолчанию число ядер)'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=1.0,
+            help='Пауза между опросами пустой очереди, секунд'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Выполнить готовые задачи и выйти'
+        )
+
+    def handle(self, *args, **options):
+        concurrency = max(options['concurrency'], 1)
+        poll_interval = options['poll_interval']
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        connections.close_all()
+        # future -> id задачи, чтобы знать, какие задачи потеряны.
+        in_flight = {}
+        done = failed = 0
+        pool = self.make_pool(concurrency)
+        self.stdout.write(f'Воркеры запущены: {concurrency}')
+        try:
+            while not self.stopping:
+                free = concurrency - len(in_flight)
+                job_ids = claim_jobs(free) if free else []
+                broken = False
+                try:
+                    for job_id in job_ids:
+                        in_flight[pool.submit(run_job, job_id)] = job_id
+                except BrokenProcessPool:
+                    broken = True
+                if not in_flight and not broken:
+                    if options['once']:
+                        break
+                    time.sleep(poll_interval)
+                    continue
+                finished, _ = wait(
+                    in_flight, timeout=poll_interval,
+                    return_when=FIRST_COMPLETED)
+                for future in finished:
+                    try:
+                        ok = future.result()
+                    except BrokenProcessPool:
+                        broken = True
+                        continue
+                    del in_flight[future]
+                    if ok:
+                        done += 1
+                    else:
+                        failed += 1
+                if broken:
+                    # Процесс пула погиб: остальные процессы пул уже
+                    # остановил, задачи в работе потеряны. Завершённые
+                    # задачи release_lost_jobs не трогает.
+                    lost = set(in_flight.values()) | set(job_ids)
+                    released = release_lost_jobs(lost)
+                    failed += released
+                    in_flight = {}
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    pool = self.make_pool(concurrency)
+                    self.stderr.write(
+                        'Процесс воркера завершился аварийно, пул '
+                        f'перезапущен; потеряно задач: {released}')
+            wait(in_flight)
+        finally:
+            pool.shutdown()
+        self.stdout.write(self.style.SUCCESS(
+            f'Воркеры остановлены: выполнено {done}, с ошибкой {failed}'))
+
+    @staticmethod
+    def make_pool(concurrency):
+        return ProcessPoolExecutor(max_workers=concurrency,
+                                   initializer=_init_process)
+
+    def stop(self, signum, frame):
+        self.stopping = True
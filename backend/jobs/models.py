@@ -0,0 +1,33 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    class Status(models.TextChoices):
+        QUEUED = 'queued', 'В очереди'
+        RUNNING = 'running', 'Выполняется'
+        DONE = 'done', 'Выполнена'
+        FAILED = 'failed', 'Ошибка'
+
+    task = models.CharField('Задача', max_length=128)
+    payload = models.JSONField('Параметры', default=dict, blank=True)
+    status = models.CharField(
+        'Статус', max_length=16,
+        choices=Status.choices, default=Status.QUEUED
+    )
+    attempts = models.PositiveIntegerField('Попыток', default=0)
+    max_attempts = models.PositiveIntegerField('Максимум попыток', default=5)
+    run_at = models.DateTimeField('Запустить не раньше', default=timezone.now)
+    locked_at = models.DateTimeField('Взята в работу', null=True, blank=True)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['run_at']
+        indexes = [models.Index(fields=['status', 'run_at'])]
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+
+    def __str__(self):
+        return f'{self.task} #{self.pk} ({self.status})'
@@ -0,0 +1,39 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Job
+
+registry = {}
+
+
+def task(name):
+    """Регистрирует функцию как фоновую задачу под именем ``name``."""
+    def decorator(func):
+        registry[name] = func
+        return func
+    return decorator
+
+
+def enqueue(name, *, delay=None, max_attempts=None, **payload):
+    """
+    Ставит задачу в очередь. Запись создаётся в текущей транзакции,
+    поэтому воркеры увидят задачу только после её коммита.
+    """
+    if name not in registry:
+        raise KeyError(f'Неизвестная задача: {name}')
+    job = Job(task=name, payload=payload)
+    if delay is not None:
+        job.run_at = timezone.now() + timedelta(seconds=delay)
+    if max_attempts is not None:
+        job.max_attempts = max_attempts
+    job.save()
+    return job
+
+
+def retry_delay(attempts):
+    """Экспоненциальная задержка перед следующей попыткой, в секундах."""
+    base = getattr(settings, 'JOBS_RETRY_BASE_DELAY', 10)
+    limit = getattr(settings, 'JOBS_RETRY_MAX_DELAY', 60 * 60)
+    return min(base * 2 ** max(attempts - 1, 0), limit)
@@ -0,0 +1,108 @@
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+from .tasks import registry, retry_delay
+
+logger = logging.getLogger(__name__)
+
+LOST_MESSAGE = 'Процесс воркера завершился, не закончив задачу.'
+
+
+def claim_jobs(limit):
+    """
+    Забирает до ``limit`` готовых к запуску задач.
+
+    На PostgreSQL строки блокируются SELECT ... FOR UPDATE SKIP LOCKED,
+    так что параллельные воркеры не получат одну задачу дважды.
+    На SQLite, где такой блокировки нет, задачи помечаются одним
+    UPDATE с подзапросом: он сразу берёт блокировку на запись.
+    Задачи, зависшие в работе дольше JOBS_LOCK_TIMEOUT, возвращаются
+    в оборот, пока не исчерпаны попытки; исчерпавшие помечаются сбоем.
+    """
+    now = timezone.now()
+    stale = now - timedelta(
+        seconds=getattr(settings, 'JOBS_LOCK_TIMEOUT', 15 * 60))
+    Job.objects.filter(
+        status=Job.Status.RUNNING, locked_at__lt=stale,
+        attempts__gte=F('max_attempts'),
+    ).update(status=Job.Status.FAILED, finished_at=now, locked_at=None,
+             last_error=LOST_MESSAGE)
+    ready = Job.objects.filter(
+        Q(status=Job.Status.QUEUED, run_at__lte=now)
+        | Q(status=Job.Status.RUNNING, locked_at__lt=stale,
+            attempts__lt=F('max_attempts'))
+    ).order_by('run_at')
+    claim = {
+        'status': Job.Status.RUNNING,
+        'locked_at': now,
+        'attempts': F('attempts') + 1,
+    }
+    if not connection.features.has_select_for_update_skip_locked:
+        Job.objects.filter(
+            id__in=ready.values('id')[:limit]).update(**claim)
+        return list(Job.objects.filter(
+            status=Job.Status.RUNNING, locked_at=now
+        ).values_list('id', flat=True))
+    with transaction.atomic():
+        ids = list(
+            ready.select_for_update(skip_locked=True)
+            .values_list('id', flat=True)[:limit]
+        )
+        Job.objects.filter(id__in=ids).update(**claim)
+    return ids
+
+
+def retry_or_fail(job, error):
+    """Планирует повтор задачи или, если попытки исчерпаны, сбой."""
+    job.last_error = error
+    if job.attempts >= job.max_attempts:
+        job.status = Job.Status.FAILED
+        job.finished_at = timezone.now()
+    else:
+        job.status = Job.Status.QUEUED
+        job.run_at = timezone.now() + timedelta(
+            seconds=retry_delay(job.attempts))
+    job.locked_at = None
+    job.save(update_fields=['status', 'run_at', 'locked_at',
+                            'last_error', 'finished_at'])
+
+
+def release_lost_jobs(job_ids):
+    """
+    Задачи, чей процесс погиб (OOM, падение в C-расширении): не
+    дожидаясь JOBS_LOCK_TIMEOUT, ставит на повтор или помечает сбоем.
+    Какая из задач пула убила процесс, неизвестно, поэтому попытка
+    засчитывается каждой.
+    """
+    jobs = Job.objects.filter(pk__in=job_ids, status=Job.Status.RUNNING)
+    for job in jobs:
+        logger.error('Задача %s потеряна: процесс воркера завершился', job)
+        retry_or_fail(job, LOST_MESSAGE)
+    return len(jobs)
+
+
+def run_job(job_id):
+    """Выполняет задачу; при ошибке планирует повтор или помечает сбой."""
+    close_old_connections()
+    try:
+        job = Job.objects.get(pk=job_id)
+        try:
+            registry[job.task](**job.payload)
+        except Exception:
+            logger.exception('Задача %s упала', job)
+            retry_or_fail(job, traceback.format_exc())
+            return False
+        job.status = Job.Status.DONE
+        job.finished_at = timezone.now()
+        job.locked_at = None
+        job.save(update_fields=['status', 'finished_at', 'locked_at'])
+        return True
+    finally:
+        close_old_connections()
@@ -7,10 +7,7 @@ class RecipeAdmin(admin.ModelAdmin):
     list_display = ('id', 'name', 'author', 'favorites_count')
     search_fields = ('name', 'author__username', 'author__email')
     list_filter = ('tags',)
-
-    def favorites_count(self, obj):
-        return obj.favorited_by.count()
-    favorites_count.short_description = 'В избранном'
+    readonly_fields = ('favorites_count', 'carts_count')
 
 
 admin.site.register(RecipeIngredient)
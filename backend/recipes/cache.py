@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import Recipe
+
+CACHE_TIMEOUT = getattr(settings, 'RECIPE_CACHE_TIMEOUT', 60 * 60)
+
+
+def cache_key(recipe_id, updated_at):
+    return f'recipes:repr:{recipe_id}:{updated_at.timestamp()}'
+
+
+def get_representations(keys):
+    return cache.get_many(keys)
+
+
+async def aget_representations(keys):
+    return await cache.aget_many(keys)
+
+
+def set_representations(mapping):
+    cache.set_many(mapping, CACHE_TIMEOUT)
+
+
+def invalidate_recipe(recipe_id, updated_at):
+    cache.delete(cache_key(recipe_id, updated_at))
+
+
+def touch_recipes(queryset):
+    """
+    Сдвигает updated_at у затронутых рецептов: ключи их кэша меняются,
+    и следующий запрос перестроит представление.
+    """
+    Recipe.objects.filter(
+        pk__in=queryset.values('pk')
+    ).update(updated_at=timezone.now())
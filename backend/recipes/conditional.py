@@ -0,0 +1,103 @@
+import hashlib
+import json
+
+from django.db.models import Count, Max, Subquery
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import Favorite, ShoppingCart
+
+
+def _viewer_version(model, user):
+    """
+    Версия набора строк пользователя: число и максимальный id. Id только
+    растут, поэтому любое добавление или удаление меняет пару.
+    """
+    rows = model.objects.filter(user=user).order_by().values('user')
+    return {
+        f'{model._meta.model_name}_count': Max(Subquery(
+            rows.annotate(value=Count('pk')).values('value'))),
+        f'{model._meta.model_name}_last': Max(Subquery(
+            rows.annotate(value=Max('pk')).values('value'))),
+    }
+
+
+def validator_aggregates(user):
+    """Агрегаты для get_validators: версия набора рецептов и зрителя."""
+    aggregates = {'count': Count('pk'), 'last_modified': Max('updated_at')}
+    if user.is_authenticated:
+        aggregates.update(_viewer_version(Favorite, user))
+        aggregates.update(_viewer_version(ShoppingCart, user))
+    return aggregates
+
+
+def build_validators(versions, user, weak=False, extra=None):
+    """
+    Валидаторы по результату агрегации validator_aggregates; extra —
+    дополнительные версии, от которых зависит ответ (например, порядок).
+    """
+    if not versions['count']:
+        return None
+    versions.update(extra or {})
+    last_modified = versions['last_modified']
+    versions['last_modified'] = last_modified.isoformat()
+    digest = hashlib.md5(
+        json.dumps(versions, sort_keys=True).encode()).hexdigest()
+    return {
+        'etag': f'W/"{digest}"' if weak else f'"{digest}"',
+        'last_modified': last_modified,
+        # Last-Modified не отражает ни флаги зрителя, ни удаление
+        # рецептов из списка, поэтому сам по себе годится только для
+        # анонимного запроса одного рецепта.
+        'trust_last_modified': not weak and not user.is_authenticated,
+    }
+
+
+def get_validators(queryset, user, weak=False, extra=None):
+    """
+    ETag и Last-Modified для набора рецептов одним агрегирующим запросом.
+
+    Возвращает None, если набор пуст. В ETag входят число рецептов,
+    самый свежий updated_at и версии избранного и корзины зрителя,
+    от которых зависят флаги в ответе.
+    """
+    versions = queryset.order_by().aggregate(**validator_aggregates(user))
+    return build_validators(versions, user, weak, extra)
+
+
+def is_not_modified(request, validators):
+    """Есть ли у клиента актуальная версия."""
+    if validators is None:
+        return False
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match is not None:
+        # Для If-None-Match используется слабое сравнение.
+        etag = validators['etag'].removeprefix('W/')
+        etags = {tag.removeprefix('W/') for tag in parse_etags(if_none_match)}
+        return '*' in etags or etag in etags
+    since = parse_http_date_safe(
+        request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    return (
+        since is not None
+        and validators['trust_last_modified']
+        and int(validators['last_modified'].timestamp()) <= since
+    )
+
+
+def not_modified(request, validators):
+    """Ответ 304, если у клиента актуальная версия, иначе None."""
+    if not is_not_modified(request, validators):
+        return None
+    return apply_validators(
+        Response(status=status.HTTP_304_NOT_MODIFIED), validators)
+
+
+def apply_validators(response, validators):
+    if validators is not None and response.status_code in (200, 304):
+        response['ETag'] = validators['etag']
+        response['Last-Modified'] = http_date(
+            validators['last_modified'].timestamp())
+    patch_vary_headers(response, ('Authorization',))
+    return response
@@ -0,0 +1,140 @@
+from array import array
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import transaction
+
+from .models import IngredientPosting, RecipeIngredient
+
+# Беззнаковые 32-битные целые: id рецепта и число его ингредиентов.
+TYPECODE = 'I'
+# Сколько ингредиентов можно передать в один запрос поиска.
+MAX_INGREDIENTS = 100
+
+# Включается, когда код сам обновляет индекс после массовых операций
+# с RecipeIngredient, — сигналы тогда его не трогают.
+_manual = ContextVar('coverage_manual', default=False)
+
+
+def pack(entries):
+    """{id рецепта: число ингредиентов} -> bytes для IngredientPosting."""
+    values = array(TYPECODE)
+    for recipe_id in sorted(entries):
+        values.append(recipe_id)
+        values.append(entries[recipe_id])
+    return values.tobytes()
+
+
+def unpack(data):
+    values = array(TYPECODE)
+    values.frombytes(bytes(data))
+    return values
+
+
+def update_recipe(recipe_id, old_ids, new_ids):
+    """
+    Переносит рецепт в индексе со старого набора ингредиентов на новый.
+
+    Вызывается в транзакции, меняющей состав рецепта; затронутые строки
+    индекса блокируются в порядке ключа, чтобы параллельные сохранения
+    не теряли изменения друг друга.
+    """
+    new_ids = set(new_ids)
+    touched = set(old_ids) | new_ids
+    if not touched:
+        return
+    IngredientPosting.objects.bulk_create(
+        [IngredientPosting(ingredient_id=pk) for pk in new_ids],
+        ignore_conflicts=True,
+    )
+    postings = list(
+        IngredientPosting.objects.select_for_update().filter(
+            ingredient_id__in=touched).order_by('pk')
+    )
+    for posting in postings:
+        values = unpack(posting.recipes)
+        entries = dict(zip(values[0::2], values[1::2]))
+        if posting.ingredient_id in new_ids:
+            entries[recipe_id] = len(new_ids)
+        else:
+            entries.pop(recipe_id, None)
+        posting.recipes = pack(entries)
+    IngredientPosting.objects.bulk_update(postings, ['recipes'])
+
+
+@transaction.atomic
+def refresh_recipe(recipe_id, changed_ids=()):
+    """
+    Приводит индекс рецепта к его текущему составу в базе; changed_ids —
+    ингредиенты, из которых рецепт мог пропасть.
+    """
+    current = set(RecipeIngredient.objects.filter(
+        recipe_id=recipe_id).values_list('ingredient_id', flat=True))
+    update_recipe(recipe_id, current | set(changed_ids), current)
+
+
+@contextmanager
+def manual_updates():
+    """Блок, в котором индекс обновляется явными вызовами update_recipe."""
+    token = _manual.set(True)
+    try:
+        yield
+    finally:
+        _manual.reset(token)
+
+
+def is_manual():
+    return _manual.get()
+
+
+def rank_recipes(ingredient_ids):
+    """
+    Рецепты, в которых есть хотя бы один из ингредиентов.
+
+    Возвращает список (id рецепта, покрыто, не хватает): сначала больше
+    покрытых, затем меньше недостающих, затем новые рецепты.
+    """
+    covered = Counter()
+    totals = {}
+    postings = IngredientPosting.objects.filter(
+        ingredient_id__in=ingredient_ids).values_list('recipes', flat=True)
+    for data in postings:
+        values = unpack(data)
+        recipe_ids = values[0::2]
+        covered.update(recipe_ids)
+        totals.update(zip(recipe_ids, values[1::2]))
+    ranked = [
+        (recipe_id, count, totals[recipe_id] - count)
+        for recipe_id, count in covered.items()
+    ]
+    ranked.sort(key=lambda row: (-row[1], row[2], -row[0]))
+    return ranked
+
+
+def rebuild(batch_size=1000):
+    """Строит индекс заново по RecipeIngredient. Возвращает число строк."""
+    postings = {}
+    recipe_id = None
+    ingredient_ids = []
+
+    def flush():
+        for pk in ingredient_ids:
+            postings.setdefault(pk, {})[recipe_id] = len(ingredient_ids)
+
+    rows = RecipeIngredient.objects.order_by('recipe_id').values_list(
+        'recipe_id', 'ingredient_id').iterator(chunk_size=batch_size)
+    for row_recipe_id, ingredient_id in rows:
+        if row_recipe_id != recipe_id:
+            flush()
+            recipe_id, ingredient_ids = row_recipe_id, []
+        ingredient_ids.append(ingredient_id)
+    flush()
+
+    IngredientPosting.objects.all().delete()
+    IngredientPosting.objects.bulk_create(
+        [IngredientPosting(ingredient_id=pk, recipes=pack(entries))
+         for pk, entries in postings.items()],
+        batch_size=batch_size,
+    )
+    return len(postings)
@@ -0,0 +1,115 @@
+"""
+Лента подписок: рецепты авторов, на которых подписан пользователь.
+
+Новый рецепт раскладывается по лентам подписчиков фоновой задачей
+(fan-out on write), поэтому чтение ленты — это выборка по индексу
+TimelineEntry. Рецепты авторов, у которых подписчиков больше
+``FEED_FANOUT_MAX_SUBSCRIBERS``, не раскладываются: они подмешиваются
+при чтении (pull), чтобы один рецепт не порождал миллион строк.
+Порог проверяется по текущему числу подписчиков: если автор опустится
+ниже него, рецепты, вышедшие за время pull, в ленты уже не попадут.
+"""
+import heapq
+from itertools import islice
+
+from django.conf import settings
+
+from users.models import Subscription
+from .models import Recipe, TimelineEntry
+
+
+def max_subscribers():
+    return getattr(settings, 'FEED_FANOUT_MAX_SUBSCRIBERS', 10_000)
+
+
+def is_pull_author(author):
+    return author.subscribers_count > max_subscribers()
+
+
+def fan_out(recipe_id, batch_size=1000):
+    """Добавляет рецепт в ленты подписчиков автора, пачками."""
+    recipe = Recipe.objects.filter(pk=recipe_id).select_related(
+        'author').only('created_at', 'author__subscribers_count').first()
+    if recipe is None or is_pull_author(recipe.author):
+        return 0
+    subscriptions = Subscription.objects.filter(
+        author_id=recipe.author_id).order_by('pk')
+    last_pk = 0
+    total = 0
+    while True:
+        batch = list(subscriptions.filter(pk__gt=last_pk).values_list(
+            'pk', 'user_id')[:batch_size])
+        if not batch:
+            return total
+        TimelineEntry.objects.bulk_create([
+            TimelineEntry(user_id=user_id, recipe_id=recipe.pk,
+                          created_at=recipe.created_at)
+            for _, user_id in batch
+        ], ignore_conflicts=True)
+        total += len(batch)
+        last_pk = batch[-1][0]
+
+
+def backfill(user, author):
+    """После подписки — последние рецепты автора в ленту user."""
+    if is_pull_author(author):
+        return
+    limit = getattr(settings, 'FEED_BACKFILL_LIMIT', 100)
+    recipes = Recipe.objects.filter(author=author).order_by(
+        '-created_at', '-id').values_list('id', 'created_at')[:limit]
+    TimelineEntry.objects.bulk_create([
+        TimelineEntry(user=user, recipe_id=recipe_id, created_at=created_at)
+        for recipe_id, created_at in recipes
+    ], ignore_conflicts=True)
+
+
+def trim(user, author):
+    """После отписки — убирает рецепты автора из ленты user."""
+    TimelineEntry.objects.filter(user=user, recipe__author=author).delete()
+
+
+class Feed:
+    """
+    Лента user как последовательность пар (id рецепта, created_at) от
+    новых к старым — для Paginator. Срез сливает записи TimelineEntry и
+    рецепты pull-авторов, каждый источник читается не дальше конца среза.
+    """
+
+    def __init__(self, user):
+        pull_authors = list(Subscription.objects.filter(
+            user=user, author__subscribers_count__gt=max_subscribers()
+        ).values_list('author_id', flat=True))
+        pushed = TimelineEntry.objects.filter(user=user)
+        self.sources = [pushed]
+        if pull_authors:
+            # Рецепты, разложенные до того, как автор стал pull-автором,
+            # придут из второго источника.
+            self.sources = [
+                pushed.exclude(recipe__author_id__in=pull_authors),
+                Recipe.objects.filter(author_id__in=pull_authors),
+            ]
+
+    @staticmethod
+    def _rows(queryset):
+        if queryset.model is TimelineEntry:
+            return queryset.order_by('-created_at', '-recipe_id').values_list(
+                'recipe_id', 'created_at')
+        return queryset.order_by('-created_at', '-id').values_list(
+            'id', 'created_at')
+
+    def count(self):
+        return sum(queryset.count() for queryset in self.sources)
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice) or index.step is not None:
+            raise TypeError('Лента поддерживает только срезы.')
+        start, stop = index.start or 0, index.stop
+        if len(self.sources) == 1:
+            return list(self._rows(self.sources[0])[start:stop])
+        streams = [self._rows(queryset)[:stop] for queryset in self.sources]
+        merged = heapq.merge(
+            *streams, key=lambda row: (row[1], row[0]), reverse=True)
+        return list(islice(merged, start, stop))
@@ -1,17 +1,52 @@
 import django_filters
+from django.db.models import Case, Exists, IntegerField, OuterRef, When
+
 from recipes.models import Recipe
+from recipes.rankings import RANKINGS, get_ranking
+from recipes.search import search_recipes
+from tags.registry import get_slug_map
+
+
+def tag_choices():
+    return [(slug, slug) for slug in get_slug_map()]
 
 
 class RecipeFilter(django_filters.FilterSet):
     author = django_filters.NumberFilter(field_name='author__id')
-    tags = django_filters.AllValuesMultipleFilter(field_name='tags__slug')
+    tags = django_filters.MultipleChoiceFilter(
+        choices=tag_choices, method='filter_tags')
     is_favorited = django_filters.NumberFilter(method='filter_is_favorited')
     is_in_shopping_cart = django_filters.BooleanFilter(
         method='filter_is_in_shopping_cart')
+    search = django_filters.CharFilter(method='filter_search')
+    ordering = django_filters.ChoiceFilter(
+        choices=[(name, name) for name in RANKINGS],
+        method='filter_ordering')
 
     class Meta:
         model = Recipe
-        fields = ['author', 'tags', 'is_favorited', 'is_in_shopping_cart']
+        fields = ['author', 'tags', 'is_favorited', 'is_in_shopping_cart',
+                  'search', 'ordering']
+
+    def filter_search(self, queryset, name, value):
+        return search_recipes(queryset, value)
+
+    def filter_ordering(self, queryset, name, value):
+        """Только рецепты из заранее посчитанного рейтинга, в его порядке."""
+        ids = get_ranking(value)['ids']
+        if not ids:
+            return queryset.none()
+        return queryset.filter(pk__in=ids).order_by(Case(
+            *[When(pk=pk, then=position) for position, pk in enumerate(ids)],
+            output_field=IntegerField()))
+
+    def filter_tags(self, queryset, name, value):
+        slug_map = get_slug_map()
+        tag_ids = [slug_map[slug] for slug in value if slug in slug_map]
+        return queryset.filter(Exists(
+            Recipe.tags.through.objects.filter(
+                recipe_id=OuterRef('pk'), tag_id__in=tag_ids)
+        ))
 
     def filter_is_favorited(self, queryset, name, value):
         user = self.request.user
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.similarity import rebuild
+
+
+class Command(BaseCommand):
+    help = ('Расчёт похожих рецептов по совместным добавлениям в избранное '
+            'и корзины и по общим ингредиентам')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=10,
+            help='Сколько соседей хранить для рецепта (по умолчанию 10)'
+        )
+        parser.add_argument(
+            '--ingredient-weight',
+            type=float,
+            default=0.3,
+            help='Вес близости по ингредиентам от 0 до 1 (по умолчанию 0.3)'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Сколько рецептов сравнивать за один шаг (по умолчанию 1000)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Размер пакета при записи (по умолчанию 1000)'
+        )
+
+    def handle(self, *args, **options):
+        if not 0 <= options['ingredient_weight'] <= 1:
+            raise CommandError('--ingredient-weight должен быть от 0 до 1.')
+        count = rebuild(
+            top=max(options['top'], 1),
+            chunk_size=max(options['chunk_size'], 1),
+            ingredient_weight=options['ingredient_weight'],
+            batch_size=max(options['batch_size'], 1),
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Похожие рецепты пересчитаны: пар {count}'))
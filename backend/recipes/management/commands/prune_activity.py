@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from recipes.rankings import prune_activity
+
+
+class Command(BaseCommand):
+    help = 'Удаление почасовых счётчиков, вышедших из окна trending'
+
+    def handle(self, *args, **options):
+        deleted = prune_activity()
+        self.stdout.write(self.style.SUCCESS(
+            f'Удалено счётчиков: {deleted}'))
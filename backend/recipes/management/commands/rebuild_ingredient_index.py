@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.coverage import rebuild
+
+
+class Command(BaseCommand):
+    help = ('Перестроение обратного индекса ингредиентов для поиска '
+            'рецептов по продуктам')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Размер пакета при чтении и записи (по умолчанию 1000)'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            count = rebuild(max(options['batch_size'], 1))
+        self.stdout.write(self.style.SUCCESS(
+            f'Индекс перестроен: ингредиентов {count}'))
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.30 on 2026-10-18 02:07
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+INDEX_NAME = 'recipes_recipe_search_vector_gin'
+
+
+def create_search_index(apps, schema_editor):
+    """GIN-индекс и заполнение вектора — только на PostgreSQL."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS {INDEX_NAME} '
+        'ON recipes_recipe USING gin (search_vector)'
+    )
+    schema_editor.execute(
+        'UPDATE recipes_recipe SET search_vector = '
+        "setweight(to_tsvector('russian', coalesce(name, '')), 'A') || "
+        "setweight(to_tsvector('russian', coalesce(text, '')), 'B')"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS {INDEX_NAME}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0002_image_renditions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.30 on 2026-10-18 02:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ingredients', '0001_initial'),
+        ('recipes', '0003_recipe_search_vector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngredientPosting',
+            fields=[
+                ('ingredient', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='posting', serialize=False, to='ingredients.ingredient')),
+                ('recipes', models.BinaryField(default=bytes)),
+            ],
+            options={
+                'verbose_name': 'Индекс ингредиента',
+                'verbose_name_plural': 'Индекс ингредиентов',
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.30 on 2026-10-18 02:11
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def count_of(model, field):
+    rows = model.objects.filter(**{field: OuterRef('pk')}).order_by()
+    return Coalesce(Subquery(
+        rows.values(field).annotate(value=Count('pk')).values('value')
+    ), Value(0))
+
+
+def fill_counters(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    Recipe.objects.update(
+        favorites_count=count_of(apps.get_model('recipes', 'Favorite'),
+                                 'recipe'),
+        carts_count=count_of(apps.get_model('recipes', 'ShoppingCart'),
+                             'recipe'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_ingredient_posting'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='carts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='в корзинах'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='в избранном'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
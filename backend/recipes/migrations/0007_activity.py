@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-18 02:29
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_timeline'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeActivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField(db_index=True)),
+                ('favorites', models.PositiveIntegerField(default=0)),
+                ('carts', models.PositiveIntegerField(default=0)),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activity', to='recipes.recipe')),
+            ],
+            options={
+                'verbose_name': 'Активность рецепта',
+                'verbose_name_plural': 'Активность рецептов',
+                'unique_together': {('recipe', 'bucket')},
+            },
+        ),
+    ]
@@ -0,0 +1,52 @@
+from django.conf import settings
+from django.db import migrations
+
+BATCH_SIZE = 5000
+
+
+def backfill_timelines(apps, schema_editor):
+    """
+    Ленты для подписок, оформленных до появления TimelineEntry: по
+    FEED_BACKFILL_LIMIT последних рецептов каждого автора, как при
+    подписке. Рецепты pull-авторов подмешиваются при чтении.
+    """
+    Recipe = apps.get_model('recipes', 'Recipe')
+    TimelineEntry = apps.get_model('recipes', 'TimelineEntry')
+    Subscription = apps.get_model('users', 'Subscription')
+    limit = getattr(settings, 'FEED_BACKFILL_LIMIT', 100)
+    max_subscribers = getattr(settings, 'FEED_FANOUT_MAX_SUBSCRIBERS', 10_000)
+
+    author_ids = Subscription.objects.filter(
+        author__subscribers_count__lte=max_subscribers
+    ).order_by('author_id').values_list('author_id', flat=True).distinct()
+    batch = []
+    for author_id in author_ids.iterator():
+        recipes = list(Recipe.objects.filter(author_id=author_id).order_by(
+            '-created_at', '-id').values_list('id', 'created_at')[:limit])
+        if not recipes:
+            continue
+        subscribers = Subscription.objects.filter(
+            author_id=author_id).values_list('user_id', flat=True)
+        for user_id in subscribers.iterator():
+            batch.extend(
+                TimelineEntry(user_id=user_id, recipe_id=recipe_id,
+                              created_at=created_at)
+                for recipe_id, created_at in recipes
+            )
+            if len(batch) >= BATCH_SIZE:
+                TimelineEntry.objects.bulk_create(
+                    batch, ignore_conflicts=True)
+                batch = []
+    TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_similar_recipes'),
+        ('users', '0003_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_timelines, migrations.RunPython.noop),
+    ]
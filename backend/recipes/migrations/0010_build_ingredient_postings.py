@@ -0,0 +1,39 @@
+from django.db import migrations
+
+from recipes.coverage import pack
+
+
+def build_postings(apps, schema_editor):
+    """
+    Индекс для рецептов, созданных до появления IngredientPosting, — то
+    же, что делает команда rebuild_ingredient_index.
+    """
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+    IngredientPosting = apps.get_model('recipes', 'IngredientPosting')
+
+    ingredients = {}
+    for recipe_id, ingredient_id in RecipeIngredient.objects.values_list(
+            'recipe_id', 'ingredient_id').iterator(chunk_size=2000):
+        ingredients.setdefault(recipe_id, []).append(ingredient_id)
+    postings = {}
+    for recipe_id, ingredient_ids in ingredients.items():
+        for pk in ingredient_ids:
+            postings.setdefault(pk, {})[recipe_id] = len(ingredient_ids)
+
+    IngredientPosting.objects.all().delete()
+    IngredientPosting.objects.bulk_create(
+        [IngredientPosting(ingredient_id=pk, recipes=pack(entries))
+         for pk, entries in postings.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_backfill_timelines'),
+    ]
+
+    operations = [
+        migrations.RunPython(build_postings, migrations.RunPython.noop),
+    ]
@@ -1,14 +1,29 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator
 from django.db import models
 from django.contrib.auth import get_user_model
 
+from common.counters import CounterFieldsMixin
 from ingredients.models import Ingredient
 from tags.models import Tag
 
 User = get_user_model()
 
 
-class Recipe(models.Model):
+class RecipeQuerySet(models.QuerySet):
+    def with_related(self):
+        """Всё, что нужно для полного представления рецепта."""
+        return self.defer('search_vector').select_related(
+            'author').prefetch_related(
+            'tags',
+            models.Prefetch(
+                'recipe_ingredients',
+                queryset=RecipeIngredient.objects.select_related('ingredient')
+            ),
+        )
+
+
+class Recipe(CounterFieldsMixin, models.Model):
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -16,6 +31,7 @@ class Recipe(models.Model):
     )
     name = models.CharField(max_length=256)
     image = models.ImageField(upload_to='recipes/images/')
+    image_renditions = models.JSONField(default=dict, blank=True)
     text = models.TextField()
     cooking_time = models.PositiveIntegerField(
         validators=[MinValueValidator(1)]
@@ -28,6 +44,17 @@ class Recipe(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Заполняется после сохранения, GIN-индекс создаётся миграцией
+    # только на PostgreSQL.
+    search_vector = SearchVectorField(null=True, editable=False)
+    # Денормализованные счётчики, см. common.counters.
+    favorites_count = models.PositiveIntegerField(
+        'в избранном', default=0, editable=False)
+    carts_count = models.PositiveIntegerField(
+        'в корзинах', default=0, editable=False)
+
+    objects = RecipeQuerySet.as_manager()
+    counter_fields = ('favorites_count', 'carts_count')
 
     class Meta:
         ordering = ['-created_at']
@@ -54,6 +81,107 @@ class RecipeIngredient(models.Model):
         return f'{self.ingredient.name} x {self.amount} for {self.recipe.id}'
 
 
+class IngredientPosting(models.Model):
+    """
+    Обратный индекс ингредиента: упакованные пары (id рецепта, число
+    ингредиентов в нём), отсортированные по id рецепта.
+    """
+    ingredient = models.OneToOneField(
+        Ingredient,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='posting'
+    )
+    recipes = models.BinaryField(default=bytes)
+
+    class Meta:
+        verbose_name = 'Индекс ингредиента'
+        verbose_name_plural = 'Индекс ингредиентов'
+
+    def __str__(self):
+        return f'Индекс: {self.ingredient_id}'
+
+
+class TimelineEntry(models.Model):
+    """
+    Рецепт в ленте подписок пользователя (см. recipes.feed). Дата
+    копируется из рецепта, чтобы лента читалась по индексу без JOIN.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline'
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries'
+    )
+    created_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('user', 'recipe')
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-recipe'],
+                         name='recipes_timeline_user_idx'),
+        ]
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Ленты подписок'
+
+    def __str__(self):
+        return f'Лента: {self.user_id} -> {self.recipe_id}'
+
+
+class RecipeActivity(models.Model):
+    """
+    Сколько раз рецепт добавили в избранное и в корзины за час,
+    начинающийся в ``bucket`` (см. recipes.rankings).
+    """
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='activity'
+    )
+    bucket = models.DateTimeField(db_index=True)
+    favorites = models.PositiveIntegerField(default=0)
+    carts = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('recipe', 'bucket')
+        verbose_name = 'Активность рецепта'
+        verbose_name_plural = 'Активность рецептов'
+
+    def __str__(self):
+        return f'Активность: {self.recipe_id} @ {self.bucket:%Y-%m-%d %H:00}'
+
+
+class SimilarRecipe(models.Model):
+    """
+    Похожий рецепт: соседи по совместным добавлениям в избранное и
+    корзины и по общим ингредиентам (recipes.similarity).
+    """
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similar_recipes'
+    )
+    similar = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    position = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        unique_together = ('recipe', 'position')
+        verbose_name = 'Похожий рецепт'
+        verbose_name_plural = 'Похожие рецепты'
+
+    def __str__(self):
+        return f'{self.recipe_id} ~ {self.similar_id}: {self.score:.3f}'
+
+
 class Favorite(models.Model):
     user = models.ForeignKey(
         User,
@@ -0,0 +1,104 @@
+"""
+Рейтинги рецептов для ``?ordering=trending|popular``.
+
+trending — добавления в избранное и корзины за последние
+``TRENDING_WINDOW_HOURS`` с затуханием: вклад часа уменьшается вдвое
+каждые ``TRENDING_HALF_LIFE_HOURS``. Почасовые счётчики RecipeActivity
+обновляются вместе с избранным и корзиной (recipes.relations).
+popular — по денормализованному счётчику избранного. Часы, вышедшие
+из окна, удаляет команда prune_activity (prune_activity()).
+
+Оба рейтинга — первые ``RANKING_SIZE`` id, они пересчитываются не чаще
+раза в ``RANKING_CACHE_TIMEOUT`` и хранятся в кэше.
+"""
+import hashlib
+import heapq
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from common.counters import change_counters
+from .models import Favorite, Recipe, RecipeActivity, ShoppingCart
+
+RANKINGS = ('trending', 'popular')
+# Модель связи -> поле RecipeActivity.
+ACTIVITY_FIELDS = {Favorite: 'favorites', ShoppingCart: 'carts'}
+WEIGHTS = {'favorites': 1.0, 'carts': 1.0}
+
+
+def bucket_start(moment=None):
+    moment = moment or timezone.now()
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def record_activity(model, recipe_ids, delta):
+    """Изменяет счётчики текущего часа; ниже нуля они не опускаются."""
+    field = ACTIVITY_FIELDS[model]
+    bucket = bucket_start()
+    if delta > 0:
+        RecipeActivity.objects.bulk_create([
+            RecipeActivity(recipe_id=recipe_id, bucket=bucket)
+            for recipe_id in recipe_ids
+        ], ignore_conflicts=True)
+    change_counters(RecipeActivity.objects.filter(
+        bucket=bucket, recipe_id__in=recipe_ids), **{field: delta})
+
+
+def window_start(now=None):
+    """Первый час окна trending."""
+    window = getattr(settings, 'TRENDING_WINDOW_HOURS', 7 * 24)
+    return bucket_start((now or timezone.now()) - timedelta(hours=window))
+
+
+def prune_activity():
+    """Удаляет счётчики часов, которые в рейтинг уже не входят."""
+    deleted, _ = RecipeActivity.objects.filter(
+        bucket__lt=window_start()).delete()
+    return deleted
+
+
+def _trending(size):
+    now = timezone.now()
+    half_life = getattr(settings, 'TRENDING_HALF_LIFE_HOURS', 24)
+    since = window_start(now)
+    scores = defaultdict(float)
+    rows = RecipeActivity.objects.filter(bucket__gte=since).values_list(
+        'recipe_id', 'bucket', 'favorites', 'carts')
+    for recipe_id, bucket, favorites, carts in rows.iterator(
+            chunk_size=2000):
+        age = (now - bucket).total_seconds() / 3600
+        scores[recipe_id] += (
+            WEIGHTS['favorites'] * favorites + WEIGHTS['carts'] * carts
+        ) * 0.5 ** (age / half_life)
+    top = heapq.nlargest(
+        size, ((score, recipe_id) for recipe_id, score in scores.items()
+               if score > 0))
+    return [recipe_id for _, recipe_id in top]
+
+
+def _popular(size):
+    return list(Recipe.objects.filter(favorites_count__gt=0).order_by(
+        '-favorites_count', '-id').values_list('id', flat=True)[:size])
+
+
+def get_ranking(name):
+    """
+    ``{'ids': [...], 'version': ...}`` рейтинга ``name``; version меняется
+    вместе с порядком и входит в ETag списка.
+    """
+    key = f'rankings:{name}'
+    ranking = cache.get(key)
+    if ranking is None:
+        size = getattr(settings, 'RANKING_SIZE', 100)
+        compute = _trending if name == 'trending' else _popular
+        ids = compute(size)
+        ranking = {
+            'ids': ids,
+            'version': hashlib.md5(str(ids).encode()).hexdigest(),
+        }
+        cache.set(key, ranking,
+                  getattr(settings, 'RANKING_CACHE_TIMEOUT', 5 * 60))
+    return ranking
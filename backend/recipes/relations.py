@@ -0,0 +1,67 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from common.counters import change_counters
+from .models import Favorite, Recipe, ShoppingCart
+from .rankings import record_activity
+
+User = get_user_model()
+
+# Модель связи -> (счётчик рецепта, счётчик пользователя или None).
+COUNTERS = {
+    Favorite: ('favorites_count', None),
+    ShoppingCart: ('carts_count', 'shopping_cart_count'),
+}
+
+
+def _change(model, user, recipe_ids, delta):
+    recipe_counter, user_counter = COUNTERS[model]
+    change_counters(Recipe.objects.filter(pk__in=recipe_ids),
+                    **{recipe_counter: delta})
+    if user_counter is not None:
+        change_counters(User.objects.filter(pk=user.pk),
+                        **{user_counter: delta * len(recipe_ids)})
+    record_activity(model, recipe_ids, delta)
+
+
+def _lock_user(user):
+    """
+    Сериализует изменения избранного и корзины одного пользователя:
+    параллельные запросы (двойной клик) не гоняются за одними строками.
+    """
+    list(User.objects.select_for_update().filter(pk=user.pk).values('pk'))
+
+
+@transaction.atomic
+def add_recipes(model, user, recipe_ids):
+    """
+    Добавляет рецепты в избранное или корзину постоянным числом запросов.
+    Возвращает множество действительно добавленных id; несуществующие
+    рецепты пропускаются.
+    """
+    _lock_user(user)
+    existing = set(Recipe.objects.filter(
+        pk__in=recipe_ids).values_list('pk', flat=True))
+    present = set(model.objects.filter(
+        user=user, recipe_id__in=existing).values_list(
+        'recipe_id', flat=True))
+    added = existing - present
+    if added:
+        model.objects.bulk_create(
+            [model(user=user, recipe_id=pk) for pk in added],
+            ignore_conflicts=True,
+        )
+        _change(model, user, added, 1)
+    return added
+
+
+@transaction.atomic
+def remove_recipes(model, user, recipe_ids):
+    """Убирает рецепты одним DELETE. Возвращает множество удалённых id."""
+    _lock_user(user)
+    rows = model.objects.filter(user=user, recipe_id__in=recipe_ids)
+    removed = set(rows.values_list('recipe_id', flat=True))
+    if removed:
+        rows.delete()
+        _change(model, user, removed, -1)
+    return removed
@@ -0,0 +1,56 @@
+from functools import reduce
+from operator import and_
+
+from django.contrib.postgres.search import (
+    SearchQuery, SearchRank, SearchVector
+)
+from django.db import connections
+from django.db.models import Case, F, IntegerField, Q, Value, When
+
+SEARCH_CONFIG = 'russian'
+
+
+def is_postgresql(queryset):
+    return connections[queryset.db].vendor == 'postgresql'
+
+
+def recipe_vector():
+    """Поисковый вектор: название весомее описания."""
+    return (
+        SearchVector('name', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('text', weight='B', config=SEARCH_CONFIG)
+    )
+
+
+def update_search_vector(queryset):
+    """Пересчитывает сохранённый tsvector; на других СУБД ничего не делает."""
+    if is_postgresql(queryset):
+        queryset.update(search_vector=recipe_vector())
+
+
+def search_recipes(queryset, value):
+    """
+    Полнотекстовый поиск с ранжированием.
+
+    На PostgreSQL — по сохранённому вектору с GIN-индексом и русской
+    морфологией. На остальных СУБД — медленнее, через icontains по
+    каждому слову, выше рецепты со всеми словами в названии.
+    """
+    value = value.strip()
+    if not value:
+        return queryset
+    if is_postgresql(queryset):
+        query = SearchQuery(value, config=SEARCH_CONFIG,
+                            search_type='websearch')
+        return queryset.filter(search_vector=query).annotate(
+            search_rank=SearchRank(F('search_vector'), query)
+        ).order_by('-search_rank', '-created_at')
+    words = value.split()
+    in_name = reduce(and_, (Q(name__icontains=word) for word in words))
+    return queryset.filter(reduce(and_, (
+        Q(name__icontains=word) | Q(text__icontains=word) for word in words
+    ))).annotate(search_rank=Case(
+        When(in_name, then=Value(1)),
+        default=Value(0),
+        output_field=IntegerField(),
+    )).order_by('-search_rank', '-created_at')
@@ -1,13 +1,32 @@
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
 from django.db import transaction
 from rest_framework import serializers
 
-from common.fields import Base64ImageField
+from api.viewer import ViewerStateListSerializer, get_viewer_state
+from common.fields import Base64ImageField, RenditionsField
+from common.counters import change_counters
+from common.images import (
+    schedule_renditions, schedule_renditions_cleanup
+)
 from common.serializers import UserBaseSerializer
 from ingredients.models import Ingredient
+from jobs.tasks import enqueue
 from tags.models import Tag
-from .models import Recipe, RecipeIngredient, Favorite, ShoppingCart
+from .cache import (
+    aget_representations, cache_key, get_representations, invalidate_recipe,
+    set_representations
+)
+from .coverage import manual_updates, update_recipe as update_coverage
+from .feed import is_pull_author
+from .models import Recipe, RecipeIngredient
 from tags.serializers import TagSerializer
 
+User = get_user_model()
+
+# Сколько рецептов можно передать в одну пакетную операцию.
+BULK_LIMIT = 100
+
 
 class IngredientInRecipeReadSerializer(serializers.ModelSerializer):
     id = serializers.IntegerField(source='ingredient.id', read_only=True)
@@ -27,39 +46,142 @@ class RecipeListSerializer(serializers.ModelSerializer):
         source='recipe_ingredients', many=True, read_only=True)
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
+    image_renditions = RenditionsField()
 
     class Meta:
         model = Recipe
         fields = (
             'id', 'tags', 'author', 'ingredients',
             'is_favorited', 'is_in_shopping_cart',
-            'name', 'image', 'text', 'cooking_time'
+            'name', 'image', 'image_renditions', 'text', 'cooking_time'
         )
+        list_serializer_class = ViewerStateListSerializer
+
+    @staticmethod
+    def prime_viewer_state(state, recipes):
+        state.prime_recipes(recipe.id for recipe in recipes)
 
     def get_is_favorited(self, obj):
-        request = self.context.get('request')
-        user = getattr(request, 'user', None)
-        if not user or not user.is_authenticated:
-            return False
-        return Favorite.objects.filter(user=user, recipe=obj).exists()
+        return get_viewer_state(self.context).is_favorited(obj.id)
 
     def get_is_in_shopping_cart(self, obj):
-        request = self.context.get('request')
-        user = getattr(request, 'user', None)
-        if not user or not user.is_authenticated:
-            return False
-        return ShoppingCart.objects.filter(user=user, recipe=obj).exists()
+        return get_viewer_state(self.context).is_in_shopping_cart(obj.id)
+
+
+def _render_shared(recipes):
+    """Представление рецептов без флагов зрителя и без привязки к хосту."""
+    data = RecipeListSerializer(recipes, many=True).data
+    for item in data:
+        item.pop('is_favorited', None)
+        item.pop('is_in_shopping_cart', None)
+    return data
+
+
+def cache_recipes(recipes):
+    """Перестраивает и кладёт в кэш представления переданных рецептов."""
+    recipes = list(Recipe.objects.with_related().filter(
+        id__in=[recipe.id for recipe in recipes]))
+    rendered = {}
+    for recipe, item in zip(recipes, _render_shared(recipes)):
+        rendered[cache_key(recipe.id, recipe.updated_at)] = item
+    set_representations(rendered)
+    return rendered
+
+
+def absolutize_urls(item, request):
+    """Делает абсолютными ссылки на файлы в закэшированном представлении."""
+    if item['image']:
+        item['image'] = request.build_absolute_uri(item['image'])
+    item['image_renditions'] = {
+        label: {
+            key: value if key == 'width'
+            else request.build_absolute_uri(value)
+            for key, value in variants.items()
+        }
+        for label, variants in item['image_renditions'].items()
+    }
+
+
+def render_recipes(recipes, request, rendered=None):
+    """
+    Принимает рецепты с загруженными id и updated_at (например, из
+    ``.only()``) и возвращает их полные представления в том же порядке.
+
+    Общая для всех часть берётся из rendered (результат cache_recipes,
+    если он уже под рукой) или из кэша, недостающие рецепты
+    перестраиваются одним запросом, а флаги текущего пользователя
+    подставляются при каждом ответе.
+    """
+    recipes = list(recipes)
+    keys = {
+        recipe.id: cache_key(recipe.id, recipe.updated_at)
+        for recipe in recipes
+    }
+    cached = {
+        key: rendered[key] for key in keys.values()
+        if rendered and key in rendered
+    }
+    unknown = [key for key in keys.values() if key not in cached]
+    if unknown:
+        cached.update(get_representations(unknown))
+    missing = [recipe for recipe in recipes if keys[recipe.id] not in cached]
+    if missing:
+        cached.update(cache_recipes(missing))
+
+    state = get_viewer_state({'request': request})
+    state.prime_recipes(keys)
+    return _assemble(recipes, keys, cached, state, request)
+
+
+async def arender_recipes(recipes, request, state):
+    """Асинхронный вариант render_recipes с уже созданным ViewerState."""
+    keys = {
+        recipe.id: cache_key(recipe.id, recipe.updated_at)
+        for recipe in recipes
+    }
+    cached = await aget_representations(keys.values())
+    missing = [recipe for recipe in recipes if keys[recipe.id] not in cached]
+    if missing:
+        cached.update(await sync_to_async(cache_recipes)(missing))
+    await state.aprime_recipes(keys)
+    return _assemble(recipes, keys, cached, state, request)
+
+
+def _assemble(recipes, keys, cached, state, request):
+    """Общая часть из кэша плюс флаги зрителя, в порядке Meta.fields."""
+    result = []
+    for recipe in recipes:
+        shared = cached.get(keys[recipe.id])
+        if shared is None:
+            # Рецепт изменили между выборкой id и рендерингом.
+            continue
+        flags = {
+            'is_favorited': state.is_favorited(recipe.id),
+            'is_in_shopping_cart': state.is_in_shopping_cart(recipe.id),
+        }
+        item = {
+            field: flags[field] if field in flags else shared[field]
+            for field in RecipeListSerializer.Meta.fields
+        }
+        if request is not None:
+            absolutize_urls(item, request)
+        result.append(item)
+    return result
+
+
+class RecipeIdsSerializer(serializers.Serializer):
+    """Список id рецептов для пакетных операций."""
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=BULK_LIMIT,
+    )
 
 
 class IngredientInRecipeWriteSerializer(serializers.Serializer):
     id = serializers.IntegerField()
     amount = serializers.IntegerField(min_value=1)
 
-    def validate_id(self, value):
-        if not Ingredient.objects.filter(id=value).exists():
-            raise serializers.ValidationError(f'Ингредиент {value} не найден.')
-        return value
-
 
 class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
     ingredients = IngredientInRecipeWriteSerializer(many=True)
@@ -83,6 +205,12 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
                 raise serializers.ValidationError(
                     'Ингредиенты должны быть уникальны.')
             seen.add(ingredient_id)
+        missing = seen - set(
+            Ingredient.objects.filter(id__in=seen).values_list(
+                'id', flat=True))
+        if missing:
+            raise serializers.ValidationError(
+                f'Ингредиенты не найдены: {sorted(missing)}')
         return value
 
     def validate_tags(self, value):
@@ -104,15 +232,39 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
         return value
 
     @transaction.atomic
-    def _set_ingredients(self, recipe, ingredients_data):
-        RecipeIngredient.objects.filter(recipe=recipe).delete()
+    def _set_ingredients(self, recipe, ingredients_data, created=False):
+        """
+        Приводит состав рецепта к ingredients_data: вставляет новые строки,
+        обновляет изменившиеся количества и удаляет лишние, не трогая
+        остальные.
+        """
+        amounts = {item['id']: item['amount'] for item in ingredients_data}
+        existing = {} if created else {
+            row.ingredient_id: row
+            for row in RecipeIngredient.objects.filter(
+                recipe=recipe).only('id', 'ingredient_id', 'amount')
+        }
+        removed = existing.keys() - amounts.keys()
+        changed = []
+        for ingredient_id, row in existing.items():
+            amount = amounts.get(ingredient_id)
+            if amount is not None and amount != row.amount:
+                row.amount = amount
+                changed.append(row)
+        if removed:
+            with manual_updates():
+                RecipeIngredient.objects.filter(
+                    recipe=recipe, ingredient_id__in=removed).delete()
+        if changed:
+            RecipeIngredient.objects.bulk_update(changed, ['amount'])
         RecipeIngredient.objects.bulk_create([
             RecipeIngredient(
-                recipe=recipe,
-                ingredient_id=item['id'],
-                amount=item['amount'],
-            ) for item in ingredients_data
+                recipe=recipe, ingredient_id=ingredient_id, amount=amount)
+            for ingredient_id, amount in amounts.items()
+            if ingredient_id not in existing
         ])
+        if existing.keys() != amounts.keys():
+            update_coverage(recipe.id, existing.keys(), amounts.keys())
 
     @transaction.atomic
     def create(self, validated_data):
@@ -121,16 +273,42 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
         recipe = Recipe.objects.create(
             author=self.context['request'].user, **validated_data
         )
-        recipe.tags.set(tag_ids)
-        self._set_ingredients(recipe, ingredients)
+        # У нового рецепта тегов нет — читать существующие незачем.
+        recipe.tags.add(*tag_ids)
+        self._set_ingredients(recipe, ingredients, created=True)
+        change_counters(User.objects.filter(pk=recipe.author_id),
+                        recipes_count=1)
+        # Ленты подписчиков заполняет воркер; рецепты pull-авторов
+        # подмешиваются при чтении ленты (recipes.feed).
+        if not is_pull_author(recipe.author):
+            enqueue('recipes.fan_out', recipe_id=recipe.id)
+
+        def cache_created():
+            self.rendered = cache_recipes([recipe])
+
+        transaction.on_commit(cache_created)
+        schedule_renditions(recipe, 'image', 'image_renditions')
         return recipe
 
     @transaction.atomic
     def update(self, instance, validated_data):
         ingredients = validated_data.pop('ingredients', None)
         tag_ids = validated_data.pop('tags', None)
+        previous_version = instance.updated_at
+        if 'image' in validated_data:
+            schedule_renditions_cleanup(instance.image_renditions)
+            validated_data['image_renditions'] = {}
         if tag_ids is not None:
             instance.tags.set(tag_ids)
         if ingredients is not None:
             self._set_ingredients(instance, ingredients)
-        return super().update(instance, validated_data)
+        recipe = super().update(instance, validated_data)
+
+        def refresh_cache():
+            invalidate_recipe(recipe.id, previous_version)
+            self.rendered = cache_recipes([recipe])
+
+        transaction.on_commit(refresh_cache)
+        if 'image' in validated_data:
+            schedule_renditions(recipe, 'image', 'image_renditions')
+        return recipe
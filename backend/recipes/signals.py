@@ -0,0 +1,114 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import (
+    post_delete, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+
+from ingredients.models import Ingredient
+from common.counters import change_counters
+from tags.models import Tag
+from .cache import touch_recipes
+from .coverage import (
+    is_manual, refresh_recipe, update_recipe as update_coverage
+)
+from .models import Recipe, RecipeIngredient
+from .search import update_search_vector
+
+User = get_user_model()
+
+AUTHOR_FIELDS = {'username', 'first_name', 'last_name', 'email'}
+COVERAGE_FIELDS = {'recipe', 'recipe_id', 'ingredient', 'ingredient_id'}
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not {'name', 'text'} & set(
+            update_fields):
+        return
+    update_search_vector(Recipe.objects.filter(pk=instance.pk))
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    update_coverage(instance.pk, instance.recipe_ingredients.values_list(
+        'ingredient_id', flat=True), ())
+    # Каскадом удалятся и строки корзин, счётчики их владельцев
+    # уменьшаются здесь.
+    change_counters(User.objects.filter(pk=instance.author_id),
+                    recipes_count=-1)
+    change_counters(User.objects.filter(cart_items__recipe=instance),
+                    shopping_cart_count=-1)
+
+
+@receiver(pre_save, sender=RecipeIngredient)
+def recipe_ingredient_saving(sender, instance, raw=False, update_fields=None,
+                             **kwargs):
+    # None — индекс не затронут, () — новая строка, иначе прежние
+    # (рецепт, ингредиент).
+    instance._coverage_before = None
+    if raw or is_manual() or (
+            update_fields is not None
+            and not COVERAGE_FIELDS & set(update_fields)):
+        return
+    before = None
+    if instance.pk is not None:
+        before = RecipeIngredient.objects.filter(pk=instance.pk).values_list(
+            'recipe_id', 'ingredient_id').first()
+    instance._coverage_before = before or ()
+
+
+@receiver(post_save, sender=RecipeIngredient)
+def recipe_ingredient_saved(sender, instance, **kwargs):
+    """Строки, записанные мимо сериализатора рецепта (админка и т. п.)."""
+    before = instance.__dict__.pop('_coverage_before', None)
+    if before is None or before == (instance.recipe_id,
+                                    instance.ingredient_id):
+        return
+    if before and before[0] != instance.recipe_id:
+        refresh_recipe(before[0], before[1:])
+    refresh_recipe(instance.recipe_id, before[1:])
+
+
+@receiver(post_delete, sender=RecipeIngredient)
+def recipe_ingredient_deleted(sender, instance, origin=None, **kwargs):
+    # Удаление самого рецепта уже учтено в recipe_deleted.
+    if is_manual() or isinstance(origin, Recipe) or getattr(
+            origin, 'model', None) is Recipe:
+        return
+    refresh_recipe(instance.recipe_id, [instance.ingredient_id])
+
+
+@receiver(pre_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    change_counters(Recipe.objects.filter(favorited_by__user=instance),
+                    favorites_count=-1)
+    change_counters(Recipe.objects.filter(in_carts__user=instance),
+                    carts_count=-1)
+    change_counters(User.objects.filter(subscribers__user=instance),
+                    subscribers_count=-1)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(pre_delete, sender=Tag)
+def tag_changed(sender, instance, **kwargs):
+    if kwargs.get('created'):
+        return
+    touch_recipes(Recipe.objects.filter(tags=instance))
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(pre_delete, sender=Ingredient)
+def ingredient_changed(sender, instance, **kwargs):
+    if kwargs.get('created'):
+        return
+    touch_recipes(
+        Recipe.objects.filter(recipe_ingredients__ingredient=instance))
+
+
+@receiver(post_save, sender=User)
+def author_changed(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        return
+    if update_fields is not None and not AUTHOR_FIELDS & set(update_fields):
+        return
+    touch_recipes(Recipe.objects.filter(author=instance))
@@ -0,0 +1,119 @@
+"""
+Похожие рецепты: косинусная близость по совместным добавлениям в
+избранное и корзины (матрица рецепт × пользователь) и по ингредиентам
+(рецепт × ингредиент). Обе матрицы нормируются построчно и склеиваются
+с весами √(1 − w) и √w, так что одно произведение X·Xᵀ даёт
+(1 − w)·cos_пользователи + w·cos_ингредиенты.
+
+Считается офлайн командой build_similar_recipes; numpy и scipy нужны
+только ей.
+"""
+from django.db import transaction
+
+from .models import (
+    Favorite, Recipe, RecipeIngredient, ShoppingCart, SimilarRecipe
+)
+
+
+def _matrix(rows, recipe_index, column_ids):
+    """Разреженная матрица рецепт × столбец по парам (рецепт, столбец)."""
+    import numpy as np
+    from scipy import sparse
+
+    column_index = {pk: i for i, pk in enumerate(column_ids)}
+    recipes, columns = [], []
+    for recipe_id, column_id in rows:
+        if recipe_id not in recipe_index:
+            # Рецепт появился уже после чтения списка рецептов.
+            continue
+        recipes.append(recipe_index[recipe_id])
+        columns.append(column_index[column_id])
+    # Повторы (рецепт и в избранном, и в корзине) суммируются.
+    return sparse.csr_matrix(
+        (np.ones(len(recipes)), (recipes, columns)),
+        shape=(len(recipe_index), len(column_index)))
+
+
+def _normalize(matrix):
+    import numpy as np
+    from scipy import sparse
+
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return sparse.diags(1 / norms) @ matrix
+
+
+def build_features(ingredient_weight):
+    """Id рецептов и склеенная нормированная матрица признаков."""
+    from scipy import sparse
+
+    recipe_ids = list(Recipe.objects.order_by('pk').values_list(
+        'pk', flat=True))
+    recipe_index = {pk: i for i, pk in enumerate(recipe_ids)}
+
+    interactions = [
+        pair
+        for model in (Favorite, ShoppingCart)
+        for pair in model.objects.values_list(
+            'recipe_id', 'user_id').iterator(chunk_size=10_000)
+    ]
+    user_ids = sorted({user_id for _, user_id in interactions})
+    ingredients = list(RecipeIngredient.objects.values_list(
+        'recipe_id', 'ingredient_id').iterator(chunk_size=10_000))
+    ingredient_ids = sorted({pk for _, pk in ingredients})
+
+    features = sparse.hstack([
+        _normalize(_matrix(interactions, recipe_index, user_ids))
+        * (1 - ingredient_weight) ** 0.5,
+        _normalize(_matrix(ingredients, recipe_index, ingredient_ids))
+        * ingredient_weight ** 0.5,
+    ]).tocsr()
+    return recipe_ids, features
+
+
+def neighbours(recipe_ids, features, top=10, chunk_size=1000):
+    """
+    (id рецепта, id соседа, позиция, близость) для top ближайших
+    соседей каждого рецепта. Близость считается блоками по chunk_size
+    строк, чтобы не держать в памяти всю матрицу рецепт × рецепт.
+    """
+    import numpy as np
+
+    transposed = features.T.tocsc()
+    for start in range(0, len(recipe_ids), chunk_size):
+        block = (features[start:start + chunk_size] @ transposed).tocsr()
+        for row in range(block.shape[0]):
+            begin, end = block.indptr[row], block.indptr[row + 1]
+            scores = block.data[begin:end]
+            columns = block.indices[begin:end]
+            # Сам рецепт себе не сосед.
+            other = (columns != start + row) & (scores > 0)
+            scores, columns = scores[other], columns[other]
+            if len(scores) > top:
+                best = np.argpartition(-scores, top)[:top]
+                scores, columns = scores[best], columns[best]
+            order = np.lexsort((columns, -scores))
+            for position, i in enumerate(order):
+                yield (recipe_ids[start + row], recipe_ids[columns[i]],
+                       position, float(scores[i]))
+
+
+@transaction.atomic
+def rebuild(top=10, chunk_size=1000, ingredient_weight=0.3,
+            batch_size=1000):
+    """Пересчитывает таблицу SimilarRecipe целиком."""
+    recipe_ids, features = build_features(ingredient_weight)
+    SimilarRecipe.objects.all().delete()
+    batch = []
+    total = 0
+    for recipe_id, similar_id, position, score in neighbours(
+            recipe_ids, features, top, chunk_size):
+        batch.append(SimilarRecipe(
+            recipe_id=recipe_id, similar_id=similar_id,
+            position=position, score=score))
+        if len(batch) >= batch_size:
+            SimilarRecipe.objects.bulk_create(batch)
+            total += len(batch)
+            batch = []
+    SimilarRecipe.objects.bulk_create(batch)
+    return total + len(batch)
@@ -0,0 +1,7 @@
+from jobs.tasks import task
+from .feed import fan_out
+
+
+@task('recipes.fan_out')
+def fan_out_recipe(recipe_id):
+    fan_out(recipe_id)
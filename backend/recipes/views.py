@@ -1,49 +1,114 @@
-from django.db.models import Prefetch
-from django.http import HttpResponse
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 
-from api.pagination import LimitPageNumberPagination
+from api.pagination import (
+    CachedCountPagination, KeysetOptInMixin, LimitPageNumberPagination
+)
 from api.permissions import IsAuthorOrReadOnly
-from api.utils import aggregate_ingredients
-from shortener.models import ShortLink
-from shortener.utils import generate_code
-from .models import Recipe, Favorite, ShoppingCart, RecipeIngredient
+from api.replicas import ReplicaReadMixin
+from api.renderers import (
+    CSVShoppingListRenderer, PDFShoppingListRenderer,
+    PlainTextShoppingListRenderer
+)
+from api.shopping_list import FORMATS
+from api.utils import iter_aggregated_ingredients
+from shortener.utils import get_or_create_short_link
+from .coverage import MAX_INGREDIENTS, rank_recipes
+from .feed import Feed
+from .rankings import RANKINGS, get_ranking
+from .models import Recipe, Favorite, ShoppingCart, SimilarRecipe
+from .relations import add_recipes, remove_recipes
 from .serializers import (
-    RecipeListSerializer, RecipeCreateUpdateSerializer
+    RecipeListSerializer, RecipeCreateUpdateSerializer, RecipeIdsSerializer,
+    render_recipes
 )
+from .conditional import apply_validators, get_validators, not_modified
 from .filters import RecipeFilter
 from common.serializers import RecipeBaseSerializer
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
-    queryset = Recipe.objects.all().prefetch_related(
-        'tags',
-        Prefetch('recipe_ingredients',
-                 queryset=RecipeIngredient.objects.select_related('ingredient')
-                 ),
-    ).select_related('author')
-    pagination_class = LimitPageNumberPagination
+class RecipeViewSet(ReplicaReadMixin, KeysetOptInMixin,
+                    viewsets.ModelViewSet):
+    queryset = Recipe.objects.with_related()
+    pagination_class = CachedCountPagination
     permission_classes = [
         permissions.IsAuthenticatedOrReadOnly, IsAuthorOrReadOnly]
     filter_backends = [DjangoFilterBackend]
     filterset_class = RecipeFilter
+    # Рейтинг и поиск сортируют по-своему, курсор — по дате.
+    keyset_conflicting_params = ('ordering', 'search')
+    # get-link создаёт ссылку и должен видеть уже созданные.
+    primary_read_actions = ('get_link',)
+    # Сколько SQL-запросов допустимо на действие (common.queries).
+    query_budgets = {
+        'list': 12,
+        'retrieve': 8,
+        'create': 25,
+        'update': 28,
+        'partial_update': 28,
+        'destroy': 20,
+        'by_ingredients': 7,
+        'feed': 10,
+        'get_link': 10,
+        'similar': 3,
+        'favorite': 12,
+        'favorite_bulk': 12,
+        'shopping_cart': 12,
+        'shopping_cart_bulk': 12,
+        'download_shopping_cart': 4,
+    }
 
     def get_serializer_class(self):
         if self.action in ('create', 'update', 'partial_update'):
             return RecipeCreateUpdateSerializer
         return RecipeListSerializer
 
+    def list(self, request, *args, **kwargs):
+        """Лента: только id и версии рецептов, представления из кэша."""
+        queryset = self.filter_queryset(self.get_queryset()).select_related(
+            None).prefetch_related(None).only('id', 'updated_at', 'created_at')
+        extra = None
+        ranking = request.query_params.get('ordering')
+        if ranking in RANKINGS:
+            # Порядок рейтинга меняется и без изменения самих рецептов.
+            extra = {'ranking': get_ranking(ranking)['version']}
+        validators = get_validators(
+            queryset, request.user, weak=True, extra=extra)
+        response = not_modified(request, validators)
+        if response is not None:
+            return response
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            response = self.get_paginated_response(
+                render_recipes(page, request))
+        else:
+            response = Response(render_recipes(queryset, request))
+        return apply_validators(response, validators)
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            recipe = self.get_queryset().filter(pk=kwargs[self.lookup_field])
+            validators = get_validators(recipe, request.user)
+        except (TypeError, ValueError):
+            validators = None
+        response = not_modified(request, validators)
+        if response is not None:
+            return response
+        return apply_validators(
+            super().retrieve(request, *args, **kwargs), validators)
+
     def create(self, request, *args, **kwargs):
         serializer = RecipeCreateUpdateSerializer(
             data=request.data, context={'request': request})
         serializer.is_valid(raise_exception=True)
         recipe = serializer.save()
-        read_serializer = RecipeListSerializer(
-            recipe, context={'request': request})
-        return Response(read_serializer.data,
+        return Response(self._render_saved(recipe, serializer, request),
                         status=status.HTTP_201_CREATED)
 
     def update(self, request, *args, **kwargs):
@@ -55,92 +120,198 @@ class RecipeViewSet(viewsets.ModelViewSet):
         )
         serializer.is_valid(raise_exception=True)
         recipe = serializer.save()
-        read_serializer = RecipeListSerializer(
-            recipe, context={'request': request})
-        return Response(read_serializer.data, status=status.HTTP_200_OK)
+        return Response(self._render_saved(recipe, serializer, request),
+                        status=status.HTTP_200_OK)
+
+    def _render_saved(self, recipe, serializer, request):
+        """
+        Ответ на запись: представление, построенное сериализатором после
+        коммита (serializer.rendered), — prefetch у экземпляра мог
+        устареть. Если его нет, оно берётся из кэша или строится заново.
+        """
+        rendered = render_recipes(
+            [recipe], request, getattr(serializer, 'rendered', None))
+        if rendered:
+            return rendered[0]
+        # Рецепт успели изменить ещё раз — отдаём текущую версию.
+        return RecipeListSerializer(
+            self.get_queryset().get(pk=recipe.pk),
+            context={'request': request}).data
 
     def partial_update(self, request, *args, **kwargs):
         kwargs['partial'] = True
         return self.update(request, *args, **kwargs)
 
+    @action(detail=False, methods=['get'], url_path='by_ingredients',
+            filter_backends=[])
+    def by_ingredients(self, request):
+        """
+        Что приготовить из имеющегося: ?ingredients=1,2,3. Рецепты
+        ранжируются по числу покрытых ингредиентов, в ответе также
+        covered и missing.
+        """
+        try:
+            ingredient_ids = {
+                int(value)
+                for chunk in request.query_params.getlist('ingredients')
+                for value in chunk.split(',') if value.strip()
+            }
+        except ValueError:
+            raise ValidationError(
+                {'ingredients': 'Ожидаются id ингредиентов.'})
+        if not ingredient_ids:
+            raise ValidationError({'ingredients': 'Обязательный параметр.'})
+        if len(ingredient_ids) > MAX_INGREDIENTS:
+            raise ValidationError({'ingredients': (
+                f'Не больше {MAX_INGREDIENTS} ингредиентов.')})
+
+        paginator = LimitPageNumberPagination()
+        page = paginator.paginate_queryset(
+            rank_recipes(ingredient_ids), request, view=self)
+        coverage = {
+            recipe_id: (covered, missing)
+            for recipe_id, covered, missing in page
+        }
+        recipes = Recipe.objects.only(
+            'id', 'updated_at', 'created_at').in_bulk(coverage)
+        results = render_recipes(
+            [recipes[pk] for pk in coverage if pk in recipes], request)
+        for item in results:
+            item['covered'], item['missing'] = coverage[item['id']]
+        return paginator.get_paginated_response(results)
+
+    @action(detail=False, methods=['get'], filter_backends=[],
+            permission_classes=[permissions.IsAuthenticated])
+    def feed(self, request):
+        """Рецепты авторов из подписок, от новых к старым."""
+        paginator = LimitPageNumberPagination()
+        page = paginator.paginate_queryset(
+            Feed(request.user), request, view=self)
+        recipes = Recipe.objects.only(
+            'id', 'updated_at', 'created_at').in_bulk(
+            [recipe_id for recipe_id, _ in page])
+        return paginator.get_paginated_response(render_recipes(
+            [recipes[pk] for pk, _ in page if pk in recipes], request))
+
+    @action(detail=True, methods=['get'], filter_backends=[])
+    def similar(self, request, pk=None):
+        """Похожие рецепты, посчитанные командой build_similar_recipes."""
+        try:
+            rows = list(SimilarRecipe.objects.filter(
+                recipe_id=int(pk)).select_related('similar').only(
+                'similar', *(f'similar__{field}'
+                             for field in RecipeBaseSerializer.Meta.fields)
+            ).order_by('position'))
+        except ValueError:
+            raise NotFound
+        if not rows:
+            # Пустой список — только для существующего рецепта.
+            get_object_or_404(Recipe.objects.only('id'), pk=pk)
+        return Response(RecipeBaseSerializer(
+            [row.similar for row in rows], many=True,
+            context={'request': request}).data)
+
     @action(detail=True, methods=['get'], url_path='get-link')
     def get_link(self, request, pk=None):
         recipe = self.get_object()
-        link = ShortLink.objects.filter(
-            target_path=f'/recipes/{recipe.id}/').first()
-        if not link:
-            code = generate_code(3)
-            link = ShortLink.objects.create(
-                code=code, target_path=f'/recipes/{recipe.id}/')
+        link = get_or_create_short_link(f'/recipes/{recipe.id}/', recipe.id)
         base = request.build_absolute_uri('/')[:-1]
         return Response({'short-link': f'{base}/s/{link.code}'},
                         status=status.HTTP_200_OK
                         )
 
-    @action(detail=True, methods=['post', 'delete'],
-            permission_classes=[permissions.IsAuthenticated]
-            )
-    def favorite(self, request, pk=None):
-        recipe = self.get_object()
-        user = request.user
+    def _toggle(self, request, model, messages):
+        """Добавление или удаление одного рецепта в избранном/корзине."""
+        recipe = get_object_or_404(
+            Recipe.objects.only(*RecipeBaseSerializer.Meta.fields),
+            pk=self.kwargs[self.lookup_field])
         if request.method == 'POST':
-            obj, created = Favorite.objects.get_or_create(
-                user=user, recipe=recipe)
-            if not created:
-                return Response({'detail': 'Рецепт уже в избранном.'},
-                                status=status.HTTP_400_BAD_REQUEST
-                                )
+            if not add_recipes(model, request.user, [recipe.pk]):
+                return Response({'detail': messages[0]},
+                                status=status.HTTP_400_BAD_REQUEST)
             return Response(
                 RecipeBaseSerializer(recipe,
                                      context={'request': request}
                                      ).data,
                 status=status.HTTP_201_CREATED)
-        deleted, _ = Favorite.objects.filter(user=user, recipe=recipe).delete()
-        if not deleted:
-            return Response({'detail': 'Рецепта не было в избранном.'},
+        if not remove_recipes(model, request.user, [recipe.pk]):
+            return Response({'detail': messages[1]},
                             status=status.HTTP_400_BAD_REQUEST)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    def _bulk(self, request, model):
+        """
+        Пакетное изменение: {"recipes": [1, 2, 3]}. Число запросов не
+        зависит от длины списка, в ответе — результат по каждому id.
+        """
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipe_ids = list(dict.fromkeys(
+            serializer.validated_data['recipes']))
+        if request.method == 'POST':
+            changed = add_recipes(model, request.user, recipe_ids)
+            done, skipped = 'added', 'exists'
+        else:
+            changed = remove_recipes(model, request.user, recipe_ids)
+            done, skipped = 'removed', 'absent'
+        unknown = set()
+        if len(changed) < len(recipe_ids):
+            unknown = set(recipe_ids) - changed - set(
+                Recipe.objects.filter(pk__in=recipe_ids).values_list(
+                    'pk', flat=True))
+        results = []
+        for pk in recipe_ids:
+            if pk in unknown:
+                result = 'not_found'
+            else:
+                result = done if pk in changed else skipped
+            results.append({'id': pk, 'status': result})
+        return Response({'results': results})
+
     @action(detail=True, methods=['post', 'delete'],
             permission_classes=[permissions.IsAuthenticated]
             )
-    def shopping_cart(self, request, pk=None):
-        recipe = self.get_object()
-        user = request.user
+    def favorite(self, request, pk=None):
+        return self._toggle(request, Favorite, (
+            'Рецепт уже в избранном.', 'Рецепта не было в избранном.'))
 
-        if request.method == 'POST':
-            obj, created = ShoppingCart.objects.get_or_create(
-                user=user, recipe=recipe)
-            if not created:
-                return Response({'detail': 'Рецепт уже в списке покупок.'},
-                                status=status.HTTP_400_BAD_REQUEST)
-            return Response(
-                RecipeBaseSerializer(
-                    recipe,
-                    context={'request': request}).data,
-                status=status.HTTP_201_CREATED)
+    @action(detail=False, methods=['post', 'delete'],
+            url_path='favorite/bulk',
+            permission_classes=[permissions.IsAuthenticated]
+            )
+    def favorite_bulk(self, request):
+        return self._bulk(request, Favorite)
 
-        deleted, _ = ShoppingCart.objects.filter(
-            user=user, recipe=recipe).delete()
-        if not deleted:
-            return Response({'detail': 'Рецепта не было в списке покупок.'},
-                            status=status.HTTP_400_BAD_REQUEST)
-        return Response(status=status.HTTP_204_NO_CONTENT)
+    @action(detail=True, methods=['post', 'delete'],
+            permission_classes=[permissions.IsAuthenticated]
+            )
+    def shopping_cart(self, request, pk=None):
+        return self._toggle(request, ShoppingCart, (
+            'Рецепт уже в списке покупок.',
+            'Рецепта не было в списке покупок.'))
 
-    @action(detail=False, methods=['get'],
+    @action(detail=False, methods=['post', 'delete'],
+            url_path='shopping_cart/bulk',
             permission_classes=[permissions.IsAuthenticated]
             )
+    def shopping_cart_bulk(self, request):
+        return self._bulk(request, ShoppingCart)
+
+    @action(detail=False, methods=['get'],
+            permission_classes=[permissions.IsAuthenticated],
+            renderer_classes=[PlainTextShoppingListRenderer,
+                              CSVShoppingListRenderer,
+                              JSONRenderer,
+                              PDFShoppingListRenderer]
+            )
     def download_shopping_cart(self, request):
-        recipes = Recipe.objects.filter(in_carts__user=request.user)
-        agg = aggregate_ingredients(recipes)
-        lines = []
-        for (name, unit), amount in agg.items():
-            lines.append(f'{name} — {amount} {unit}')
-        content = '\n'.join(lines) if lines else 'Список покупок пуст.'
-        response = HttpResponse(
-            content,
-            content_type='text/plain; charset=utf-8'
-        )
+        """Список покупок: ?format=txt|csv|json|pdf, по умолчанию txt."""
+        fmt = request.accepted_renderer.format
+        content_type, render = FORMATS[fmt]
+        rows = iter_aggregated_ingredients(
+            Recipe.objects.filter(in_carts__user=request.user))
+        response = StreamingHttpResponse(
+            render(rows), content_type=content_type)
         response['Content-Disposition'] = (
-            'attachment; filename="shopping_list.txt"')
+            f'attachment; filename="shopping_list.{fmt}"')
         return response
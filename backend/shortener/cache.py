@@ -0,0 +1,89 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import ShortLink
+
+SHARED_TIMEOUT = getattr(settings, 'SHORT_LINK_CACHE_TIMEOUT', 24 * 60 * 60)
+LOCAL_TIMEOUT = getattr(settings, 'SHORT_LINK_LOCAL_CACHE_TIMEOUT', 5 * 60)
+LOCAL_SIZE = getattr(settings, 'SHORT_LINK_LOCAL_CACHE_SIZE', 10_000)
+
+
+class LRUCache:
+    """Небольшой потокобезопасный LRU-кэш со временем жизни записей."""
+
+    def __init__(self, maxsize, timeout):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.timeout)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+
+local_cache = LRUCache(LOCAL_SIZE, LOCAL_TIMEOUT)
+
+
+def _shared_key(code):
+    return f'shortener:code:{code}'
+
+
+def resolve(code):
+    """Путь для кода: память процесса, затем общий кэш, затем база."""
+    target = local_cache.get(code)
+    if target is not None:
+        return target
+    target = cache.get(_shared_key(code))
+    if target is None:
+        target = ShortLink.objects.filter(code=code).values_list(
+            'target_path', flat=True).first()
+        if target is None:
+            return None
+        cache.set(_shared_key(code), target, SHARED_TIMEOUT)
+    local_cache.set(code, target)
+    return target
+
+
+async def aresolve(code):
+    """Асинхронный вариант resolve."""
+    target = local_cache.get(code)
+    if target is not None:
+        return target
+    target = await cache.aget(_shared_key(code))
+    if target is None:
+        target = await ShortLink.objects.filter(code=code).values_list(
+            'target_path', flat=True).afirst()
+        if target is None:
+            return None
+        await cache.aset(_shared_key(code), target, SHARED_TIMEOUT)
+    local_cache.set(code, target)
+    return target
+
+
+def forget(code):
+    local_cache.delete(code)
+    cache.delete(_shared_key(code))
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 02:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shortener', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='shortlink',
+            name='target_path',
+            field=models.CharField(db_index=True, max_length=256),
+        ),
+    ]
@@ -0,0 +1,12 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import forget
+from .models import ShortLink
+
+
+@receiver(post_save, sender=ShortLink)
+@receiver(post_delete, sender=ShortLink)
+def short_link_changed(sender, instance, created=False, **kwargs):
+    if not created:
+        forget(instance.code)
@@ -1,8 +1,56 @@
 import random
 import string
 
+from django.db import IntegrityError, transaction
+
+from .models import ShortLink
+
+ALPHABET = string.digits + string.ascii_letters
+RANDOM_ATTEMPTS = 5
+
 
 def generate_code(length=3):
     return ''.join(random.choices(string.ascii_letters + string.digits,
                                   k=length
                                   ))
+
+
+def encode_base62(number):
+    if number < 0:
+        raise ValueError('Ожидалось неотрицательное число.')
+    digits = []
+    while True:
+        number, remainder = divmod(number, len(ALPHABET))
+        digits.append(ALPHABET[remainder])
+        if not number:
+            return ''.join(reversed(digits))
+
+
+def _candidate_codes(number):
+    """Сначала детерминированный код, затем случайные растущей длины."""
+    yield encode_base62(number)
+    for length in range(4, 17):
+        for _ in range(RANDOM_ATTEMPTS):
+            yield generate_code(length)
+
+
+def get_or_create_short_link(target_path, number):
+    """
+    Возвращает короткую ссылку на ``target_path``, создавая её при
+    необходимости. Код — base62 от ``number`` (обычно id объекта); если он
+    уже занят, например старым случайным кодом, подбирается случайный.
+    """
+    link = ShortLink.objects.filter(target_path=target_path).first()
+    if link:
+        return link
+    for code in _candidate_codes(number):
+        try:
+            with transaction.atomic():
+                return ShortLink.objects.create(
+                    code=code, target_path=target_path)
+        except IntegrityError:
+            # Код занят или ссылку только что создал параллельный запрос.
+            link = ShortLink.objects.filter(target_path=target_path).first()
+            if link:
+                return link
+    raise IntegrityError(f'Не удалось подобрать код для {target_path}')
@@ -1,7 +1,18 @@
-from django.shortcuts import get_object_or_404, redirect
-from .models import ShortLink
+from django.http import Http404
+from django.shortcuts import redirect
+from .cache import aresolve, resolve
 
 
 def redirect_short_link(request, code):
-    link = get_object_or_404(ShortLink, code=code)
-    return redirect(link.target_path)
+    target_path = resolve(code)
+    if target_path is None:
+        raise Http404('Короткая ссылка не найдена.')
+    return redirect(target_path)
+
+
+async def aredirect_short_link(request, code):
+    """Асинхронный вариант для ASGI (ASYNC_READ_VIEWS)."""
+    target_path = await aresolve(code)
+    if target_path is None:
+        raise Http404('Короткая ссылка не найдена.')
+    return redirect(target_path)
@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Tag
+
+REGISTRY_KEY = 'tags:registry'
+
+
+def get_slug_map():
+    """
+    Словарь slug -> id всех тегов. Изменение тега сбрасывает кэш, но при
+    локальном кэше — только в своём процессе, поэтому запись живёт не
+    дольше ``TAG_REGISTRY_CACHE_TIMEOUT`` секунд.
+    """
+    slug_map = cache.get(REGISTRY_KEY)
+    if slug_map is None:
+        slug_map = dict(Tag.objects.values_list('slug', 'id'))
+        cache.set(REGISTRY_KEY, slug_map,
+                  getattr(settings, 'TAG_REGISTRY_CACHE_TIMEOUT', 60))
+    return slug_map
+
+
+def invalidate():
+    cache.delete(REGISTRY_KEY)
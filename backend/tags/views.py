@@ -1,11 +1,15 @@
 from rest_framework import viewsets, mixins
+
+from api.replicas import ReplicaReadMixin
 from .models import Tag
 from .serializers import TagSerializer
 
 
-class TagViewSet(mixins.ListModelMixin,
+class TagViewSet(ReplicaReadMixin,
+                 mixins.ListModelMixin,
                  mixins.RetrieveModelMixin,
                  viewsets.GenericViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     pagination_class = None
+    query_budget = 2
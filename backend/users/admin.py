@@ -6,5 +6,8 @@ User = get_user_model()
 
 @admin.register(User)
 class UserAdmin(admin.ModelAdmin):
-    list_display = ('id', 'email', 'username', 'first_name', 'last_name')
+    list_display = ('id', 'email', 'username', 'first_name', 'last_name',
+                    'recipes_count', 'subscribers_count')
+    readonly_fields = ('recipes_count', 'subscribers_count',
+                       'shopping_cart_count')
     search_fields = ('email', 'username')
@@ -0,0 +1,51 @@
+# Generated by Django 4.2.30 on 2026-10-18 02:11
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def count_of(model, field):
+    rows = model.objects.filter(**{field: OuterRef('pk')}).order_by()
+    return Coalesce(Subquery(
+        rows.values(field).annotate(value=Count('pk')).values('value')
+    ), Value(0))
+
+
+def fill_counters(apps, schema_editor):
+    User = apps.get_model('users', 'User')
+    User.objects.update(
+        recipes_count=count_of(apps.get_model('recipes', 'Recipe'),
+                               'author'),
+        subscribers_count=count_of(apps.get_model('users', 'Subscription'),
+                                   'author'),
+        shopping_cart_count=count_of(
+            apps.get_model('recipes', 'ShoppingCart'), 'user'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_avatar_renditions'),
+        ('recipes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='recipes_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='рецептов'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='shopping_cart_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='рецептов в корзине'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='subscribers_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='подписчиков'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
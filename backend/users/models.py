@@ -1,11 +1,24 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 
+from common.counters import CounterFieldsMixin
 
-class User(AbstractUser):
+
+class User(CounterFieldsMixin, AbstractUser):
     email = models.EmailField('email', unique=True, max_length=254)
     avatar = models.ImageField('avatar',
                                upload_to='avatars/', blank=True, null=True)
+    avatar_renditions = models.JSONField(default=dict, blank=True)
+    # Денормализованные счётчики, см. common.counters.
+    recipes_count = models.PositiveIntegerField(
+        'рецептов', default=0, editable=False)
+    subscribers_count = models.PositiveIntegerField(
+        'подписчиков', default=0, editable=False)
+    shopping_cart_count = models.PositiveIntegerField(
+        'рецептов в корзине', default=0, editable=False)
+
+    counter_fields = ('recipes_count', 'subscribers_count',
+                      'shopping_cart_count')
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
@@ -1,27 +1,41 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
-from common.fields import Base64ImageField
+from api.viewer import ViewerStateListSerializer, get_viewer_state
+from common.fields import Base64ImageField, RenditionsField
 from common.serializers import UserBaseSerializer, RecipeBaseSerializer
-from .models import Subscription
-from recipes.models import Recipe, ShoppingCart
+from recipes.models import Recipe
 
 User = get_user_model()
 
 
+def get_recipes_limit(request):
+    """Значение ``recipes_limit`` из запроса или None, если оно не задано."""
+    if request is None:
+        return None
+    try:
+        limit = int(request.query_params.get('recipes_limit'))
+    except (ValueError, TypeError):
+        return None
+    return limit if limit > 0 else None
+
+
 class UserSerializer(UserBaseSerializer):
     is_subscribed = serializers.SerializerMethodField()
     avatar = serializers.ImageField(read_only=True)
+    avatar_renditions = RenditionsField()
 
     class Meta(UserBaseSerializer.Meta):
         model = User
-        fields = (*UserBaseSerializer.Meta.fields, 'is_subscribed', 'avatar')
+        fields = (*UserBaseSerializer.Meta.fields, 'is_subscribed', 'avatar',
+                  'avatar_renditions')
+        list_serializer_class = ViewerStateListSerializer
+
+    @staticmethod
+    def prime_viewer_state(state, users):
+        state.prime_authors(user.id for user in users)
 
     def get_is_subscribed(self, obj):
-        request = self.context.get('request')
-        if not request or request.user.is_anonymous:
-            return False
-        return Subscription.objects.filter(
-            user=request.user, author=obj).exists()
+        return get_viewer_state(self.context).is_subscribed(obj.id)
 
 
 class UserCreateSerializer(serializers.ModelSerializer):
@@ -45,7 +59,7 @@ class UserCreateSerializer(serializers.ModelSerializer):
 
 class UserWithRecipesSerializer(UserSerializer):
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
+    recipes_count = serializers.IntegerField(read_only=True)
     cart_count = serializers.SerializerMethodField()
 
     class Meta(UserSerializer.Meta):
@@ -54,28 +68,17 @@ class UserWithRecipesSerializer(UserSerializer):
                   'cart_count')
 
     def get_recipes(self, obj):
-        request = self.context.get('request')
-        limit = request.query_params.get('recipes_limit') if request else None
-        qs = Recipe.objects.filter(author=obj)
-        if limit:
-            try:
-                limit_value = int(limit)
-                if limit_value > 0:
-                    qs = qs[:limit_value]
-            except (ValueError, TypeError):
-                pass
-
-        return RecipeBaseSerializer(qs, many=True, context=self.context).data
-
-    def get_recipes_count(self, obj):
-        return Recipe.objects.filter(author=obj).count()
+        recipes = getattr(obj, 'limited_recipes', None)
+        if recipes is None:
+            recipes = Recipe.objects.filter(author=obj)
+            limit = get_recipes_limit(self.context.get('request'))
+            if limit:
+                recipes = recipes[:limit]
+        return RecipeBaseSerializer(
+            recipes, many=True, context=self.context).data
 
     def get_cart_count(self, obj):
-        request = self.context.get('request')
-        user = getattr(request, 'user', None)
-        if not user or not user.is_authenticated:
-            return 0
-        return ShoppingCart.objects.filter(user=user).count()
+        return get_viewer_state(self.context).cart_count
 
 
 class SetPasswordSerializer(serializers.Serializer):
@@ -1,25 +1,52 @@
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F, Prefetch, Window
+from django.db.models.functions import RowNumber
 from rest_framework import viewsets, mixins, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
-from api.pagination import LimitPageNumberPagination
+from api.pagination import KeysetOptInMixin, LimitPageNumberPagination
+from api.replicas import ReplicaReadMixin
+from api.viewer import get_viewer_state
+from common.counters import change_counters
+from common.images import (
+    schedule_renditions, schedule_renditions_cleanup
+)
+from recipes.feed import backfill, trim
+from recipes.models import Recipe
 from .models import Subscription
 from .serializers import (
     UserSerializer, UserCreateSerializer, UserWithRecipesSerializer,
-    SetPasswordSerializer, SetAvatarSerializer, SetAvatarResponseSerializer
+    SetPasswordSerializer, SetAvatarSerializer, SetAvatarResponseSerializer,
+    get_recipes_limit
 )
 
 User = get_user_model()
 
 
-class UserViewSet(mixins.ListModelMixin,
+class UserViewSet(ReplicaReadMixin,
+                  KeysetOptInMixin,
+                  mixins.ListModelMixin,
                   mixins.RetrieveModelMixin,
                   mixins.CreateModelMixin,
                   viewsets.GenericViewSet):
     queryset = User.objects.all().order_by('id')
     permission_classes = [permissions.AllowAny]
     pagination_class = LimitPageNumberPagination
+    keyset_ordering = ('id',)
+    # Сколько SQL-запросов допустимо на действие (common.queries).
+    query_budgets = {
+        'list': 4,
+        'retrieve': 3,
+        'create': 6,
+        'me': 2,
+        'set_password': 3,
+        'set_avatar': 4,
+        'delete_avatar': 4,
+        'subscriptions': 5,
+        'subscribe': 12,
+    }
 
     def get_serializer_class(self):
         if self.action == 'create':
@@ -61,7 +88,7 @@ class UserViewSet(mixins.ListModelMixin,
             return Response({'current_password': ['Неверный пароль.']},
                             status=status.HTTP_400_BAD_REQUEST)
         user.set_password(serializer.validated_data['new_password'])
-        user.save()
+        user.save(update_fields=['password'])
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(detail=False,
@@ -72,7 +99,10 @@ class UserViewSet(mixins.ListModelMixin,
         serializer = SetAvatarSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         request.user.avatar = serializer.validated_data['avatar']
-        request.user.save(update_fields=['avatar'])
+        schedule_renditions_cleanup(request.user.avatar_renditions)
+        request.user.avatar_renditions = {}
+        request.user.save(update_fields=['avatar', 'avatar_renditions'])
+        schedule_renditions(request.user, 'avatar', 'avatar_renditions')
         response = SetAvatarResponseSerializer({'avatar': request.user.avatar})
         return Response(response.data, status=status.HTTP_200_OK)
 
@@ -81,7 +111,10 @@ class UserViewSet(mixins.ListModelMixin,
         if request.user.avatar:
             request.user.avatar.delete(save=False)
             request.user.avatar = None
-            request.user.save(update_fields=['avatar'])
+            schedule_renditions_cleanup(request.user.avatar_renditions)
+            request.user.avatar_renditions = {}
+            request.user.save(
+                update_fields=['avatar', 'avatar_renditions'])
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(detail=False,
@@ -89,10 +122,25 @@ class UserViewSet(mixins.ListModelMixin,
             permission_classes=[permissions.IsAuthenticated],
             url_path='subscriptions')
     def subscriptions(self, request):
-        subs = Subscription.objects.filter(user=request.user).select_related(
-            'author').order_by('author__id')
-        authors = [s.author for s in subs]
+        recipes = Recipe.objects.only(
+            'id', 'name', 'image', 'image_renditions', 'cooking_time',
+            'author_id')
+        limit = get_recipes_limit(request)
+        if limit:
+            # Первые N рецептов каждого автора страницы одним запросом.
+            recipes = recipes.annotate(row_number=Window(
+                RowNumber(),
+                partition_by=F('author_id'),
+                order_by=F('created_at').desc(),
+            )).filter(row_number__lte=limit)
+        authors = User.objects.filter(
+            subscribers__user=request.user
+        ).prefetch_related(
+            Prefetch('recipes', queryset=recipes, to_attr='limited_recipes')
+        ).order_by('id')
         page = self.paginate_queryset(authors)
+        get_viewer_state({'request': request}).remember_subscriptions(
+            author.id for author in page)
         serializer = UserWithRecipesSerializer(
             page, many=True, context={'request': request})
         return self.get_paginated_response(serializer.data)
@@ -108,16 +156,26 @@ class UserViewSet(mixins.ListModelMixin,
             if author == user:
                 return Response({'detail': 'Нельзя подписаться на себя.'},
                                 status=status.HTTP_400_BAD_REQUEST)
-            created = Subscription.objects.get_or_create(
-                user=user, author=author)[1]
+            with transaction.atomic():
+                created = Subscription.objects.get_or_create(
+                    user=user, author=author)[1]
+                if created:
+                    change_counters(User.objects.filter(pk=author.pk),
+                                    subscribers_count=1)
+                    backfill(user, author)
             if not created:
                 return Response({'detail': 'Уже подписаны.'},
                                 status=status.HTTP_400_BAD_REQUEST)
             data = UserWithRecipesSerializer(
                 author, context={'request': request}).data
             return Response(data, status=status.HTTP_201_CREATED)
-        deleted, _ = Subscription.objects.filter(
-            user=user, author=author).delete()
+        with transaction.atomic():
+            deleted, _ = Subscription.objects.filter(
+                user=user, author=author).delete()
+            change_counters(User.objects.filter(pk=author.pk),
+                            subscribers_count=-deleted)
+            if deleted:
+                trim(user, author)
         if not deleted:
             return Response({'detail': 'Не были подписаны.'},
                             status=status.HTTP_400_BAD_REQUEST)